@@ -13,7 +13,7 @@ import sys, os
 
 sys.path.append(os.path.dirname(__file__))
 
-from utils.session import init_session
+from utils.session import init_session, save_session
 from utils.styles import inject_css
 from utils.sidebar import render_sidebar
 
@@ -31,41 +31,46 @@ init_session()
 # Inject custom CSS (full design system)
 inject_css()
 
-# ── ONBOARDING GATE ──
-if not st.session_state.get("onboarded"):
-    from modules.onboarding import render_onboarding
-    render_onboarding()
-    st.stop()
-
-# ── MAIN APP ──
-render_sidebar()
-
-tab = st.session_state.get("active_tab", "dashboard")
-
-if tab == "dashboard":
-    from modules.dashboard import render_dashboard
-    render_dashboard()
-
-elif tab == "learn":
-    from modules.learn import render_learn
-    render_learn()
-
-elif tab == "curriculum":
-    from modules.curriculum import render_curriculum
-    render_curriculum()
-
-elif tab == "flashcards":
-    from modules.flashcards import render_flashcards
-    render_flashcards()
-
-elif tab == "mindmap":
-    from modules.mindmap import render_mindmap
-    render_mindmap()
-
-elif tab == "practice":
-    from modules.practice import render_practice
-    render_practice()
-
-elif tab == "insights":
-    from modules.insights import render_insights
-    render_insights()
+# Queue this run's learner-state changes once it ends — also when a page ends it
+# early with st.rerun() or st.stop() (written behind, never blocking the page)
+try:
+    # ── ONBOARDING GATE ──
+    if not st.session_state.get("onboarded"):
+        from modules.onboarding import render_onboarding
+        render_onboarding()
+        st.stop()
+
+    # ── MAIN APP ──
+    render_sidebar()
+
+    tab = st.session_state.get("active_tab", "dashboard")
+
+    if tab == "dashboard":
+        from modules.dashboard import render_dashboard
+        render_dashboard()
+
+    elif tab == "learn":
+        from modules.learn import render_learn
+        render_learn()
+
+    elif tab == "curriculum":
+        from modules.curriculum import render_curriculum
+        render_curriculum()
+
+    elif tab == "flashcards":
+        from modules.flashcards import render_flashcards
+        render_flashcards()
+
+    elif tab == "mindmap":
+        from modules.mindmap import render_mindmap
+        render_mindmap()
+
+    elif tab == "practice":
+        from modules.practice import render_practice
+        render_practice()
+
+    elif tab == "insights":
+        from modules.insights import render_insights
+        render_insights()
+finally:
+    save_session()
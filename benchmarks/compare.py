@@ -0,0 +1,89 @@
+"""
+Compare two benchmark reports and flag regressions.
+
+    python -m benchmarks.compare benchmarks/baseline.json bench.json --threshold 0.15
+
+Exits 1 if any scenario got slower or heavier than the threshold allows,
+made more AI calls, tripped the breaker, timed out in admission or sent prompt-cache
+breakpoints the API ignored more often, or started failing.
+"""
+
+import argparse
+import json
+import sys
+
+METRICS = ("wall_ms", "max_rerun_ms", "peak_kb")
+# App counters (see benchmarks.run._counters) that should never go up between runs
+COUNTERS = (("breaker", "opened"), ("breaker", "rejected"), ("admission", "timeouts"),
+            ("prompt_cache", "skipped_calls"))
+
+
+def _load(path: str) -> tuple:
+    with open(path, encoding="utf-8") as f:
+        report = json.load(f)
+    return report.get("meta", {}), {s["id"]: s for s in report.get("scenarios", [])}
+
+
+def compare(base: dict, head: dict, threshold: float, min_ms: float) -> tuple:
+    """Return (rows, regressions) for scenarios present in both reports."""
+    rows, regressions = [], []
+    for sid in sorted(base.keys() & head.keys()):
+        old, new = base[sid], head[sid]
+        if "error" in new:
+            regressions.append(f"{sid}: now fails — {new['error']}")
+            continue
+        if "error" in old:
+            continue
+        row = {"id": sid}
+        for metric in METRICS:
+            before, after = old.get(metric, 0), new.get(metric, 0)
+            change = (after - before) / before if before else 0.0
+            row[metric] = (before, after, change)
+            noise_floor = min_ms if metric.endswith("_ms") else 0
+            if change > threshold and after - before > noise_floor:
+                regressions.append(f"{sid}: {metric} {before} → {after} (+{change:.0%})")
+        row["ai_calls"] = (old.get("ai_calls", 0), new.get("ai_calls", 0))
+        if row["ai_calls"][1] > row["ai_calls"][0]:
+            regressions.append(f"{sid}: ai_calls {row['ai_calls'][0]} → {row['ai_calls'][1]}")
+        for group, counter in COUNTERS:
+            before = old.get("counters", {}).get(group, {}).get(counter, 0)
+            after = new.get("counters", {}).get(group, {}).get(counter, 0)
+            if after > before:
+                regressions.append(f"{sid}: {group}.{counter} {before} → {after}")
+        rows.append(row)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark JSON reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative increase (0.2 = 20%%)")
+    parser.add_argument("--min-ms", type=float, default=25.0, help="ignore time changes smaller than this")
+    args = parser.parse_args(argv)
+
+    base_meta, base = _load(args.baseline)
+    head_meta, head = _load(args.candidate)
+    print(f"baseline  {base_meta.get('commit', '?')[:10]}  {base_meta.get('timestamp', '')}")
+    print(f"candidate {head_meta.get('commit', '?')[:10]}  {head_meta.get('timestamp', '')}\n")
+
+    rows, regressions = compare(base, head, args.threshold, args.min_ms)
+    print(f"{'scenario':<40} {'wall ms':>20} {'peak KB':>20} {'AI calls':>10}")
+    for row in rows:
+        wall, peak, calls = row["wall_ms"], row["peak_kb"], row["ai_calls"]
+        print(f"{row['id']:<40} {wall[0]:>8.0f}→{wall[1]:<8.0f}{wall[2]:>+4.0%} "
+              f"{peak[0]:>8}→{peak[1]:<8}{peak[2]:>+4.0%} {calls[0]:>4}→{calls[1]:<4}")
+    for sid in sorted(base.keys() - head.keys()):
+        print(f"{sid:<40} missing from candidate")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s):")
+        for line in regressions:
+            print(f"  ✗ {line}")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Deterministic fixtures for the benchmark suite — study material, PDFs and curricula"""
+
+import random
+
+# name -> (pages, words per page)
+PDF_SIZES = {
+    "small":  (4, 350),
+    "medium": (60, 450),
+    "huge":   (600, 500),
+}
+
+SUBJECT = "Physics"
+WEEK_TOPICS = [
+    "Kinematics", "Newton's Laws", "Work and Energy", "Momentum", "Rotational Motion",
+    "Gravitation", "Oscillations", "Waves", "Thermodynamics", "Kinetic Theory",
+    "Electrostatics", "Current Electricity", "Magnetism", "Optics", "Modern Physics",
+    "Semiconductors",
+]
+
+_VOCAB = (
+    "force mass acceleration velocity energy momentum torque inertia friction gravity field charge "
+    "current voltage resistance wave frequency amplitude heat entropy pressure volume temperature "
+    "lens mirror refraction photon electron nucleus equation derive law principle conserve vector "
+    "scalar displacement oscillation period spring pendulum orbit satellite potential kinetic"
+).split()
+
+
+def study_text(words: int, seed: int = 0) -> str:
+    """Pseudo-academic prose, reproducible for a given (words, seed)."""
+    rng = random.Random(seed)
+    sentences, count = [], 0
+    while count < words:
+        n = rng.randint(8, 18)
+        sentence = " ".join(rng.choice(_VOCAB) for _ in range(n))
+        sentences.append(sentence.capitalize() + ".")
+        count += n
+    return " ".join(sentences)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: int, words_per_page: int, seed: int = 0) -> bytes:
+    """A minimal, valid text PDF (Helvetica, one content stream per page) — no extra dependencies."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,   # page tree, filled in once page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for p in range(pages):
+        words = study_text(words_per_page, seed * 100003 + p).split()
+        lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        ops += [f"({_pdf_escape(line)}) Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def pdf_fixture(size: str) -> bytes:
+    pages, words = PDF_SIZES[size]
+    return make_pdf(pages, words, seed=len(size))
+
+
+def pdf_text(size: str) -> str:
+    """Roughly what extraction yields for a fixture — used when no PDF backend is installed."""
+    pages, words = PDF_SIZES[size]
+    return "\n\n".join(study_text(words, len(size) * 100003 + p) for p in range(pages))
+
+
+def curriculum(weeks: int) -> dict:
+    return {
+        "subject": SUBJECT,
+        "total_weeks": weeks,
+        "style_note": "Step-by-step pacing with weekly recall.",
+        "overall_goal": "Exam-ready command of core physics.",
+        "weeks": [
+            {
+                "week": w + 1,
+                "name": f"Week {w + 1}: {WEEK_TOPICS[w % len(WEEK_TOPICS)]}",
+                "theme": f"Foundations of {WEEK_TOPICS[w % len(WEEK_TOPICS)]}",
+                "topics": [f"{WEEK_TOPICS[w % len(WEEK_TOPICS)]} {i}" for i in range(1, 4)],
+                "focus": "Solve numericals",
+                "mode_tip": "Write each law in your own words.",
+                "progress": 0,
+            }
+            for w in range(weeks)
+        ],
+    }
+
+
+def onboarded_state(weeks: int, uploaded_text: str, tab: str) -> dict:
+    """Session state for a student who has finished onboarding, landing on `tab`."""
+    plan = curriculum(weeks)
+    return {
+        "onboarded": True,
+        "student_name": "Asha",
+        "subject": SUBJECT,
+        "syllabus_text": ", ".join(WEEK_TOPICS[:weeks]),
+        "learning_style": "stepbystep",
+        "exam_weeks": weeks,
+        "uploaded_filename": "notes.pdf" if uploaded_text else "",
+        "uploaded_text": uploaded_text,
+        "curriculum": plan,
+        "active_week": 0,
+        "active_tab": tab,
+        "topics_studied": plan["weeks"][0]["topics"][:2],
+        "weak_concepts": [plan["weeks"][0]["topics"][0]],
+        "revision_queue": [plan["weeks"][0]["topics"][0]],
+        "questions_attempted": 5,
+        "correct_count": 3,
+    }
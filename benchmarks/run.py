@@ -0,0 +1,321 @@
+"""
+End-to-end benchmarks — BharatiyaAI × LearnOS
+Drives every page through Streamlit's AppTest against the offline fake LLM
+(utils/fake_llm.py) and records per-rerun wall time, traced memory and AI calls.
+
+    python -m benchmarks.run --out bench.json
+    python -m benchmarks.run --flows learn,practice --pdfs small --weeks 4 --repeat 3
+    python -m benchmarks.compare benchmarks/baseline.json bench.json
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+sys.path.insert(0, ROOT)
+
+from benchmarks import fixtures  # noqa: E402
+
+FLOWS = ["onboarding", "dashboard", "learn", "flashcards", "mindmap", "practice", "insights"]
+EXAM_WEEKS = (1, 2, 4, 8, 12)     # the onboarding picker's options
+
+
+class BenchmarkError(RuntimeError):
+    pass
+
+
+class Recorder:
+    """
+    Times one flow rerun by rerun; AI calls are counted at the fake server.
+    A step fails if the app raised, showed an st.error banner, or — for steps that
+    must reach the model (expect_ai) — made no AI call at all.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.reruns = []
+
+    def step(self, label: str, action, expect_ai: bool = False):
+        calls = self.server.stats()["requests"]
+        gc.collect()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        at = action()
+        wall = time.perf_counter() - started
+        self.reruns.append({
+            "step": label,
+            "wall_ms": round(wall * 1000, 1),
+            "peak_kb": tracemalloc.get_traced_memory()[1] // 1024,
+            "ai_calls": self.server.stats()["requests"] - calls,
+        })
+        if at is not None and len(at.exception):
+            raise BenchmarkError(f"{label}: {at.exception[0].message}")
+        if at is not None and len(at.error):
+            raise BenchmarkError(f"{label}: st.error — {at.error[0].value}")
+        if expect_ai and not self.reruns[-1]["ai_calls"]:
+            raise BenchmarkError(f"{label}: made no AI calls")
+        return at
+
+
+# ── FLOWS ──
+# Each takes a Recorder, an AppTest factory and the scenario's fixtures.
+
+def flow_onboarding(rec, app, weeks, text):
+    at = app({"uploaded_text": text})
+    rec.step("load", at.run)
+    rec.step("type name", lambda: at.text_input(key="input_name").input("Asha").run())
+    rec.step("step 1", lambda: at.button(key="ob_step0").click().run())
+    at.text_input(key="input_subject").input(fixtures.SUBJECT)
+    rec.step("type syllabus", lambda: at.text_area(key="input_syllabus").input(
+        ", ".join(fixtures.WEEK_TOPICS[:weeks])).run())
+    rec.step("step 2", lambda: at.button(key="ob_step1").click().run())
+    rec.step("step 3", lambda: at.button(key="ob_step2").click().run())
+    rec.step("pick weeks", lambda: at.selectbox(key="input_exam_weeks").set_value(weeks).run())
+    rec.step("generate curriculum", lambda: at.button(key="ob_generate").click().run(), expect_ai=True)
+    if not at.session_state["onboarded"]:
+        raise BenchmarkError("onboarding did not produce a curriculum")
+
+
+def flow_dashboard(rec, app, weeks, text):
+    at = app(fixtures.onboarded_state(weeks, text, "dashboard"))
+    rec.step("load", at.run)
+    rec.step("rerun", at.run)
+
+
+def flow_learn(rec, app, weeks, text):
+    at = app(fixtures.onboarded_state(weeks, text, "learn"))
+    rec.step("load", at.run)
+    rec.step("type topic", lambda: at.text_input(key="learn_topic").input("Explain Newton's second law").run())
+    rec.step("explain", lambda: at.button(key="learn_ask").click().run(), expect_ai=True)
+    rec.step("type doubt", lambda: at.text_input(key="doubt_input").input("Why does mass resist force?").run())
+    rec.step("ask doubt", lambda: at.button(key="doubt_send").click().run(), expect_ai=True)
+    # A follow-up in the same week reuses the cached instructions + excerpts prefix
+    rec.step("type follow-up", lambda: at.text_input(key="doubt_input").input("And on a frictionless slope?").run())
+    rec.step("ask follow-up", lambda: at.button(key="doubt_send").click().run(), expect_ai=True)
+
+
+def flow_flashcards(rec, app, weeks, text):
+    at = app(fixtures.onboarded_state(weeks, text, "flashcards"))
+    rec.step("load", at.run)
+    rec.step("generate deck", lambda: at.button(key="fc_generate").click().run(), expect_ai=True)
+    for i in range(len(at.session_state["fc_cards"])):
+        rec.step(f"flip {i + 1}", lambda: at.button(key="fc_flip").click().run())
+        rec.step(f"know {i + 1}", lambda: at.button(key="fc_correct").click().run())
+
+
+def flow_mindmap(rec, app, weeks, text):
+    at = app(fixtures.onboarded_state(weeks, text, "mindmap"))
+    rec.step("load", at.run)
+    rec.step("generate map", lambda: at.button(key="mm_generate").click().run(), expect_ai=True)
+
+
+def flow_practice(rec, app, weeks, text):
+    at = app(fixtures.onboarded_state(weeks, text, "practice"))
+    rec.step("load", at.run)
+    rec.step("generate set", lambda: at.button(key="pq_generate").click().run(), expect_ai=True)
+    for qi in range(len(at.session_state["practice_questions"])):
+        rec.step(f"answer {qi + 1}", lambda: at.button(key=f"pq_{qi}_0").click().run())
+
+
+def flow_insights(rec, app, weeks, text):
+    at = app(fixtures.onboarded_state(weeks, text, "insights"))
+    rec.step("load", at.run)
+    rec.step("generate insights", lambda: at.button(key="gen_insights").click().run(), expect_ai=True)
+
+
+# ── HARNESS ──
+
+def _reset_caches():
+    """Fresh response cache, breaker, queue and prefetch pool so scenarios don't warm each other."""
+    from utils import ai, pdf_reader, prefetch
+    prefetch._executor().shutdown(wait=True)
+    for resource in (prefetch._executor, ai._response_cache, ai._singleflight, ai._breaker, ai._admission):
+        resource.clear()
+    ai._USAGE.clear()
+    pdf_reader._extraction_cache.cache_clear()
+    pdf_reader.get_document_index.cache_clear()
+
+
+def _prompt_cache(usage: dict) -> dict:
+    """Prompt-cache activity summed over every route, from the usage the (fake) API reported."""
+    fields = {"marked_calls": "cache_marked_calls", "hit_calls": "cache_hit_calls",
+              "skipped_calls": "cache_skipped_calls", "read_tokens": "cache_read_tokens",
+              "write_tokens": "cache_write_tokens"}
+    return {name: sum(row.get(field, 0) for row in usage.values()) for name, field in fields.items()}
+
+
+def _counters() -> dict:
+    """The app's own cache / coalescing / breaker / admission / prompt-cache counters for the run just finished."""
+    from utils import ai
+    return {
+        "cache": ai.cache_stats(),
+        "coalesce": ai.coalesce_stats(),
+        "breaker": ai.breaker_stats(),
+        "admission": ai.admission_stats(),
+        "prompt_cache": _prompt_cache(ai.usage_stats()),
+    }
+
+
+def _drain_prefetch():
+    from utils import prefetch
+    prefetch._executor().shutdown(wait=True)
+    prefetch._executor.clear()
+
+
+def _material(size: str, cache: dict) -> str:
+    if size == "none":
+        return ""
+    if size not in cache:
+        from utils import pdf_reader
+        if pdf_reader._PdfReader is not None:
+            cache[size] = "\n\n".join(text for _, text in pdf_reader.extract_pages(fixtures.pdf_fixture(size)))
+        else:
+            cache[size] = fixtures.pdf_text(size)
+    return cache[size]
+
+
+def _extract_scenario(size: str, repeat: int) -> dict:
+    from utils import pdf_reader
+    data = fixtures.pdf_fixture(size)
+    walls, peaks = [], []
+    for _ in range(repeat):
+        gc.collect()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        pages = pdf_reader.extract_pages(data)
+        walls.append((time.perf_counter() - started) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] // 1024)
+    return {
+        "id": f"pdf_extract/pdf={size}", "flow": "pdf_extract", "pdf": size, "weeks": None,
+        "wall_ms": round(statistics.median(walls), 1), "max_rerun_ms": round(max(walls), 1),
+        "peak_kb": max(peaks), "ai_calls": 0, "pages": len(pages), "bytes": len(data), "reruns": [],
+    }
+
+
+def run_scenario(flow: str, pdf: str, weeks: int, text: str, server, repeat: int, timeout: float) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    def app(state: dict):
+        at = AppTest.from_file(APP, default_timeout=timeout)
+        for key, value in state.items():
+            at.session_state[key] = value
+        return at
+
+    runs = []
+    for _ in range(repeat):
+        _reset_caches()
+        server.reset_prompt_cache()
+        rec = Recorder(server)
+        calls = server.stats()["requests"]
+        started = time.perf_counter()
+        globals()[f"flow_{flow}"](rec, app, weeks, text)
+        wall = time.perf_counter() - started
+        _drain_prefetch()   # background generations started by this flow belong to it
+        runs.append((wall, rec, server.stats()["requests"] - calls, _counters()))
+
+    wall, rec, ai_calls, counters = runs[-1]
+    return {
+        "id": f"{flow}/pdf={pdf}/weeks={weeks}", "flow": flow, "pdf": pdf, "weeks": weeks,
+        "wall_ms": round(statistics.median(run[0] for run in runs) * 1000, 1),
+        "max_rerun_ms": max(r["wall_ms"] for r in rec.reruns),
+        "peak_kb": max(r["peak_kb"] for r in rec.reruns),
+        "ai_calls": ai_calls,
+        "counters": counters,
+        "reruns": rec.reruns,
+    }
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end AppTest benchmarks against the fake LLM")
+    parser.add_argument("--flows", default=",".join(FLOWS + ["pdf_extract"]))
+    parser.add_argument("--pdfs", default="small,medium,huge", help="fixture sizes, or 'none' for no upload")
+    parser.add_argument("--weeks", default="4,8,16", help="curriculum lengths")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario; wall_ms is the median")
+    parser.add_argument("--latency", default="fixed:0", help="fake LLM time-to-first-token spec")
+    parser.add_argument("--tps", type=float, default=100000.0, help="fake LLM output tokens per second")
+    parser.add_argument("--timeout", type=float, default=120.0, help="AppTest per-run timeout (s)")
+    parser.add_argument("--out", default="bench_output.json")
+    args = parser.parse_args(argv)
+
+    flows = [f for f in args.flows.split(",") if f]
+    pdfs = [p for p in args.pdfs.split(",") if p]
+    weeks_list = [int(w) for w in args.weeks.split(",") if w]
+
+    # Isolate caches and point the app at an in-process fake before utils.ai reads its settings
+    scratch = tempfile.mkdtemp(prefix="bharatiya-bench-")
+    os.environ["AI_CACHE_DIR"] = scratch
+    os.environ["AI_CACHE_DISK_ENTRIES"] = "0"
+    os.environ["LEARNER_DB_PATH"] = os.path.join(scratch, "learners.sqlite3")
+    os.environ["LEARNER_JOURNAL_PATH"] = os.path.join(scratch, "interactions.jsonl")
+    from utils.fake_llm import FakeLLMServer
+    server = FakeLLMServer(port=0, latency=args.latency, tokens_per_second=args.tps)
+    os.environ["AI_FAKE_LLM"] = server.start()
+
+    import streamlit
+    # Seeding AppTest session state happens outside a script run; Streamlit warns on every key
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+    tracemalloc.start()
+    results, materials = [], {}
+    for pdf in pdfs:
+        text = _material(pdf, materials)
+        if "pdf_extract" in flows and pdf != "none":
+            from utils import pdf_reader
+            if pdf_reader._PdfReader is not None:
+                results.append(_extract_scenario(pdf, args.repeat))
+                print(f"{results[-1]['id']:<40} {results[-1]['wall_ms']:>9.1f} ms", flush=True)
+        for weeks in weeks_list:
+            for flow in flows:
+                if flow == "pdf_extract" or (flow == "onboarding" and weeks not in EXAM_WEEKS):
+                    continue
+                try:
+                    result = run_scenario(flow, pdf, weeks, text, server, args.repeat, args.timeout)
+                except BenchmarkError as e:
+                    result = {"id": f"{flow}/pdf={pdf}/weeks={weeks}", "flow": flow, "pdf": pdf,
+                              "weeks": weeks, "error": str(e)}
+                results.append(result)
+                summary = result.get("error") or (
+                    f"{result['wall_ms']:>9.1f} ms  {result['peak_kb']:>7} KB  {result['ai_calls']:>3} calls")
+                print(f"{result['id']:<40} {summary}", flush=True)
+    tracemalloc.stop()
+    server.stop()
+
+    report = {
+        "meta": {
+            "commit": _git("rev-parse", "HEAD"),
+            "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "streamlit": streamlit.__version__,
+            "latency": args.latency,
+            "tps": args.tps,
+            "repeat": args.repeat,
+        },
+        "scenarios": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} scenarios to {args.out}")
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,7 @@
 
 import streamlit as st
 from utils.session import set_tab
+from itertools import islice
 import math
 
 
@@ -54,7 +55,7 @@ border:1px solid rgba(255,107,43,0.15);border-radius:20px;padding:2rem;margin-bo
     topics_done = len(st.session_state.get("topics_studied", []))
     q_attempted = st.session_state.get("questions_attempted", 0)
     score = st.session_state.get("session_score")
-    weak_count = len(st.session_state.get("weak_concepts", []))
+    weak_count = len(st.session_state.weak_concepts)
 
     c1, c2, c3, c4 = st.columns(4)
     with c1:
@@ -130,7 +131,7 @@ cursor:pointer;transition:all 0.2s;height:100%;">
     # ── ADAPTIVE INTELLIGENCE PANEL ──
     priority = st.session_state.get("curriculum_priority", [])
     adaptation_triggered = st.session_state.get("adaptation_triggered", False)
-    revision_queue = st.session_state.get("revision_queue", [])
+    revision_queue = st.session_state.revision_queue
     topic_confidence = st.session_state.get("topic_confidence", {})
 
     if adaptation_triggered or revision_queue or topic_confidence:
@@ -148,10 +149,10 @@ border-left:3px solid #4A90D9;border-radius:14px;padding:1.25rem;margin-bottom:1
     Based on your performance, these weeks need attention first:
   </div>
 """, unsafe_allow_html=True)
+                weak_topics = st.session_state.weak_concepts
                 for rank, wk_idx in enumerate(priority[:3]):
                     if wk_idx < len(weeks_data):
                         w = weeks_data[wk_idx]
-                        weak_topics = st.session_state.get("weak_concepts", [])
                         overlaps = [t for t in w.get("topics", []) if t in weak_topics]
                         flag = "🔴" if overlaps else "🟡"
                         weak_badge = (
@@ -177,7 +178,7 @@ border-radius:14px;padding:1.25rem;margin-bottom:1rem;">
   <div style="font-size:0.68rem;text-transform:uppercase;letter-spacing:0.1em;
   color:#6B7A99;margin-bottom:0.75rem;">Topic Confidence</div>
 """, unsafe_allow_html=True)
-                for topic_name, data in list(topic_confidence.items())[:4]:
+                for topic_name, data in islice(topic_confidence.items(), 4):
                     score = data.get("score", 50)
                     status = data.get("status", "learning")
                     color = {"strong": "#1FAD0F", "weak": "#F5C842", "learning": "#FF6B2B"}.get(status, "#FF6B2B")
@@ -1,9 +1,10 @@
 """BharatiyaAI × LearnOS — Flashcards Page"""
 
 import streamlit as st
-from utils.ai import call_claude_json, STYLE_SYSTEM
+from utils.ai import call_claude_json, stream_claude_json, ai_spinner, AIError, STYLE_SYSTEM
 from utils.session import flag_weak, flag_strong, add_topic_studied
 from utils.pdf_reader import build_context_block
+from utils import prefetch
 
 
 def _get_week_info():
@@ -16,6 +17,39 @@ def _get_week_info():
     return "", ""
 
 
+def _render_deck_preview(cards: list):
+    """Show the first card while the rest of the deck is still streaming in."""
+    st.markdown(f"""
+<div class="fc-front">
+  <div style="font-size:0.65rem;text-transform:uppercase;letter-spacing:0.12em;color:#6B7A99;margin-bottom:1rem;">
+    Card 1 · {len(cards)} ready
+  </div>
+  <div style="font-family:'Noto Serif',serif;font-size:1.3rem;line-height:1.6;">
+    {cards[0].get('front', '')}
+  </div>
+</div>
+""", unsafe_allow_html=True)
+
+
+def _deck_context(topic: str) -> str:
+    return build_context_block(st.session_state.get("uploaded_text", ""), topic)
+
+
+def _generate_deck(uploaded_text: str, topic: str) -> list:
+    """Whole-deck generation for the background prefetcher (same prompt, same cache key)."""
+    data = call_claude_json(STYLE_SYSTEM["flashcard"], build_context_block(uploaded_text, topic))
+    return [c for c in data if isinstance(c, dict)] if isinstance(data, list) else []
+
+
+def _load_deck(cards: list, topic: str):
+    st.session_state.fc_cards = cards
+    st.session_state.fc_index = 0
+    st.session_state.fc_known = []
+    st.session_state.fc_flipped = False
+    st.session_state.last_topic = topic
+    add_topic_studied(topic)
+
+
 def render_flashcards():
     week_name, week_topics = _get_week_info()
 
@@ -51,19 +85,26 @@ border-radius:14px;padding:1.5rem;margin-bottom:1.25rem;">
 
         if st.button("🃏 Generate Flashcards", key="fc_generate", use_container_width=True):
             topic = custom_topic.strip() or week_topics or st.session_state.get("subject", "")
-            context = build_context_block(st.session_state.get("uploaded_text", ""), topic)
-            with st.spinner("Generating flashcards…"):
-                data = call_claude_json(STYLE_SYSTEM["flashcard"], context, max_tokens=1200)
-            if data and isinstance(data, list):
-                st.session_state.fc_cards = data
-                st.session_state.fc_index = 0
-                st.session_state.fc_known = []
-                st.session_state.fc_flipped = False
-                st.session_state.last_topic = topic
-                add_topic_studied(topic)
+            data, error = [], "Could not generate flashcards. Please try again."
+            if prefetch.peek("flashcards") == topic:
+                with ai_spinner("Generating flashcards…"):
+                    data = prefetch.take("flashcards")[1] or []
+            if not data:
+                preview = st.empty()
+                with ai_spinner("Generating flashcards…"):
+                    try:
+                        for card in stream_claude_json(STYLE_SYSTEM["flashcard"], _deck_context(topic)):
+                            if isinstance(card, dict):
+                                data.append(card)
+                                with preview.container():
+                                    _render_deck_preview(data)
+                    except AIError as e:
+                        data, error = [], e.message
+            if data:
+                _load_deck(data, topic)
                 st.rerun()
             else:
-                st.error("Could not generate flashcards. Check your API key.")
+                st.error(error)
         return
 
     # ── ACTIVE DECK ──
@@ -75,11 +116,13 @@ border-radius:14px;padding:1.5rem;margin-bottom:1.25rem;">
     # Deck complete
     if fc_idx >= total:
         score_pct = round(len(fc_known) / total * 100) if total else 0
-        # Update topic confidence from flashcard results
-        topic = st.session_state.get("last_topic", week_name)
-        from utils.session import update_fc_confidence, log_interaction
-        update_fc_confidence(topic, len(fc_known), total)
-        log_interaction("flashcard", topic, correct=(score_pct >= 70))
+        # Update topic confidence from flashcard results — once per completed deck, not per rerun
+        if not st.session_state.get("fc_logged"):
+            topic = st.session_state.get("last_topic", week_name)
+            from utils.session import update_fc_confidence, log_interaction
+            update_fc_confidence(topic, len(fc_known), total)
+            log_interaction("flashcard", topic, correct=(score_pct >= 70))
+            st.session_state.fc_logged = True
         st.markdown(f"""
 <div style="background:rgba(17,28,56,0.95);border:1px solid rgba(255,255,255,0.07);
 border-radius:20px;padding:2.5rem;text-align:center;margin:1rem 0;">
@@ -91,6 +134,16 @@ border-radius:20px;padding:2.5rem;text-align:center;margin:1rem 0;">
   </div>
 </div>
 """, unsafe_allow_html=True)
+        next_topic = prefetch.peek("flashcards")
+        if next_topic and st.button(f"▶ Next deck: {next_topic}", type="primary",
+                                    use_container_width=True, key="fc_next"):
+            with ai_spinner("Loading your next deck…"):
+                next_topic, deck = prefetch.take("flashcards")
+            if deck:
+                _load_deck(deck, next_topic)
+            else:
+                st.session_state.fc_cards = []
+            st.rerun()
         c1, c2, c3 = st.columns(3)
         with c1:
             if st.button("🔁 Restart Deck", use_container_width=True, key="fc_restart"):
@@ -111,6 +164,17 @@ border-radius:20px;padding:2.5rem;text-align:center;margin:1rem 0;">
                 st.rerun()
         return
 
+    # Mid-deck (a new deck or a restart): its completion hasn't been logged yet
+    if st.session_state.get("fc_logged"):
+        st.session_state.fc_logged = False
+
+    # Halfway through: start generating the next deck in the background
+    if fc_idx * 2 >= total:
+        next_topic = prefetch.next_study_topic(st.session_state.get("last_topic", ""))
+        if next_topic:
+            prefetch.prefetch("flashcards", next_topic, _generate_deck,
+                              st.session_state.get("uploaded_text", ""), next_topic)
+
     # Progress bar
     st.progress(fc_idx / total, text=f"Card {fc_idx + 1} of {total}  ·  ✓ {len(fc_known)} known")
     st.markdown("<br>", unsafe_allow_html=True)
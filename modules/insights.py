@@ -1,7 +1,12 @@
 """BharatiyaAI × LearnOS — Insights & Analytics Page"""
 
+import time
+from itertools import islice
+
 import streamlit as st
-from utils.ai import call_claude_json, INSIGHTS_SYSTEM
+from utils.ai import (
+    acall_claude_json, gather_bounded, run_async, ai_spinner, last_error_message, INSIGHTS_SYSTEM, ADAPTATION_SYSTEM
+)
 
 
 def render_insights():
@@ -17,8 +22,8 @@ def render_insights():
     topics = st.session_state.get("topics_studied", [])
     q_attempted = st.session_state.get("questions_attempted", 0)
     correct = st.session_state.get("correct_count", 0)
-    weak = st.session_state.get("weak_concepts", [])
-    strong = st.session_state.get("strong_concepts", [])
+    weak = st.session_state.weak_concepts
+    strong = st.session_state.strong_concepts
     score = st.session_state.get("session_score")
     fc_known = len(st.session_state.get("fc_known", []))
     fc_total = len(st.session_state.get("fc_cards", []))
@@ -67,13 +72,19 @@ border-radius:14px;padding:2rem;text-align:center;">
                 f"Questions attempted: {q_attempted}, Correct: {correct}, Wrong: {wrong_count}\n"
                 f"Flashcards known: {fc_known} / {fc_total}"
             )
-            with st.spinner("BharatiyaAI is analysing your session…"):
-                data = call_claude_json(INSIGHTS_SYSTEM, user_msg, max_tokens=900)
+            fresh = st.session_state.pop("insights_fresh", False)
+            # Insights and the adaptation plan are independent — generate them concurrently
+            with ai_spinner("BharatiyaAI is analysing your session…"):
+                data, plan = run_async(gather_bounded(
+                    lambda system: acall_claude_json(system, user_msg, fresh=fresh),
+                    [INSIGHTS_SYSTEM, ADAPTATION_SYSTEM],
+                ))
             if data:
                 st.session_state.insights_data = data
+                st.session_state.adaptation_data = plan if isinstance(plan, dict) else None
                 st.rerun()
             else:
-                st.error("Could not generate insights. Check your API key.")
+                st.error(last_error_message())
         return
 
     # ── DISPLAY INSIGHTS ──
@@ -108,6 +119,28 @@ border-radius:10px;padding:0.875rem 1rem;margin-bottom:1.25rem;">
   <span style="color:#F5C842;font-weight:600;">▶ Next Action: </span>
   <span style="font-size:0.875rem;">{next_action}</span>
 </div>
+""", unsafe_allow_html=True)
+
+    # Adaptation plan
+    plan = st.session_state.get("adaptation_data")
+    if plan and plan.get("should_adapt"):
+        priority = "".join(
+            f'<span style="display:inline-flex;font-size:0.7rem;padding:1px 7px;border-radius:10px;margin:2px;'
+            f'background:rgba(245,200,66,0.1);border:1px solid rgba(245,200,66,0.2);color:#F5C842;">⚑ {t}</span>'
+            for t in plan.get("priority_topics", [])[:4]
+        )
+        mode = plan.get("recommended_mode", "")
+        st.markdown(f"""
+<div style="background:rgba(17,28,56,0.95);border:1px solid rgba(255,255,255,0.07);
+border-radius:14px;padding:1.25rem;margin-bottom:1.25rem;">
+  <div style="font-size:0.68rem;text-transform:uppercase;letter-spacing:0.1em;color:#6B7A99;margin-bottom:0.5rem;">
+    🔄 Adaptive Plan
+  </div>
+  <div style="font-size:0.85rem;line-height:1.6;margin-bottom:0.5rem;">{plan.get("reason", "")}</div>
+  <div style="margin-bottom:0.5rem;">{priority}</div>
+  {f'<div style="font-size:0.8rem;color:#8892BB;margin-bottom:0.5rem;">Try <b>{mode}</b> mode — {plan.get("mode_reason", "")}</div>' if mode else ""}
+  <div style="font-size:0.8rem;color:#FF8F5A;">{plan.get("encouragement", "")}</div>
+</div>
 """, unsafe_allow_html=True)
 
     # Strengths + Improvements
@@ -198,9 +231,11 @@ border-radius:14px;padding:1.25rem;">
             if interaction_log:
                 type_icons = {"practice": "✏️", "flashcard": "🃏",
                               "doubt": "💬", "explain": "⚡"}
-                for entry in interaction_log[-6:]:
+                for entry in islice(interaction_log, max(len(interaction_log) - 6, 0), None):
                     icon = type_icons.get(entry.get("type", ""), "·")
                     correct = entry.get("correct")
+                    when = (time.strftime("%H:%M", time.localtime(entry["ts"]))
+                            if "ts" in entry else entry.get("timestamp", ""))
                     result = ""
                     if correct is True:
                         result = '<span style="color:#1FAD0F;">✓</span>'
@@ -211,7 +246,7 @@ border-radius:14px;padding:1.25rem;">
                         f'border-bottom:1px solid rgba(255,255,255,0.04);font-size:0.78rem;">'
                         f'<span>{icon}</span>'
                         f'<span style="color:#8892BB;flex:1;">{entry.get("topic","")[:22]}</span>'
-                        f'<span style="color:#6B7A99;font-size:0.68rem;">{entry.get("timestamp","")}</span>'
+                        f'<span style="color:#6B7A99;font-size:0.68rem;">{when}</span>'
                         f'{result}</div>',
                         unsafe_allow_html=True
                     )
@@ -260,11 +295,14 @@ border-radius:14px;padding:1.25rem;">
     with col_ref:
         if st.button("🔄 Refresh Insights", key="insights_refresh"):
             st.session_state.insights_data = None
+            st.session_state.adaptation_data = None
+            st.session_state.insights_fresh = True
             st.rerun()
     with col_new:
         if st.button("✏️ Take Another Test", key="insights_to_practice"):
             from utils.session import set_tab
             st.session_state.practice_questions = []
             st.session_state.practice_generated = False
+            st.session_state.pq_fresh = True
             set_tab("practice")
             st.rerun()
@@ -1,12 +1,15 @@
 """BharatiyaAI × LearnOS — Learn & Live Doubt Solver"""
 
 import streamlit as st
-from utils.ai import call_claude, call_claude_json, STYLE_SYSTEM, DOUBT_SOLVER_SYSTEM
+from utils.ai import (
+    call_claude_json, stream_claude, system_blocks, prompt_cache_chars, ai_spinner, AIError,
+    STYLE_SYSTEM, DOUBT_SOLVER_SYSTEM,
+)
 from utils.session import (
     add_topic_studied, set_tab, get_weak_context_string,
     get_recommended_mode, log_interaction
 )
-from utils.pdf_reader import extract_text, build_context_block
+from utils.pdf_reader import extract_text, build_context_block, retrieve_context
 
 
 def _get_week_context():
@@ -19,7 +22,11 @@ def _get_week_context():
     return "", [], ""
 
 
-def _build_doubt_system(style: str) -> str:
+def _build_doubt_system(style: str) -> list:
+    """
+    Doubt-solver system prompt as cacheable blocks: static rules, student profile,
+    and excerpts of the uploaded material for this week's topics (stable across turns).
+    """
     style_map = {
         "stepbystep": "structured step-by-step explanations",
         "flashcard":  "quick conceptual answers with key terms highlighted",
@@ -32,18 +39,32 @@ def _build_doubt_system(style: str) -> str:
     subject = st.session_state.get("subject", "")
     name = st.session_state.get("student_name", "the student")
 
-    system = DOUBT_SOLVER_SYSTEM
-    system += f"\n\nStudent profile:\n"
-    system += f"- Name: {name}\n- Subject: {subject}\n"
-    system += f"- Preferred style: {style_desc}\n"
+    profile = "Student profile:\n"
+    profile += f"- Name: {name}\n- Subject: {subject}\n"
+    profile += f"- Preferred style: {style_desc}\n"
     if topics_studied:
-        system += f"- Topics studied: {', '.join(topics_studied)}\n"
+        profile += f"- Topics studied: {', '.join(topics_studied)}\n"
     if weak_ctx:
-        system += f"\n{weak_ctx}\n"
+        profile += f"\n{weak_ctx}\n"
+
+    document = ""
     file_text = st.session_state.get("uploaded_text", "")
     if file_text and not file_text.startswith("[PDF"):
-        system += f"\nUploaded material (first 2000 chars):\n{file_text[:2000]}"
-    return system
+        _, week_topics, _ = _get_week_context()
+        # Sized so instructions + excerpts clear the routed model's prompt-cache minimum
+        budget = prompt_cache_chars("doubt") - len(DOUBT_SOLVER_SYSTEM)
+        excerpts = retrieve_context(file_text, " ".join([subject] + week_topics), max_chars=budget)
+        document = f"Uploaded material (excerpts for this week's topics):\n{excerpts}"
+    return system_blocks(DOUBT_SOLVER_SYSTEM, profile, document)
+
+
+def _doubt_turn(text: str) -> str:
+    """The student's turn, plus the passages of their material most relevant to it."""
+    file_text = st.session_state.get("uploaded_text", "")
+    if not file_text or file_text.startswith("[PDF"):
+        return text
+    excerpts = retrieve_context(file_text, text, max_chars=1000)
+    return f"{text}\n\n(Relevant excerpts from my material:\n{excerpts})"
 
 
 def render_learn():
@@ -64,7 +85,12 @@ def render_learn():
                      expanded=not st.session_state.get("uploaded_filename")):
         uploaded = st.file_uploader("PDF or TXT", type=["pdf", "txt"], key="learn_upload")
         if uploaded:
-            text = extract_text(uploaded)
+            bar = st.progress(0.0, text="Reading your material…")
+            text = extract_text(
+                uploaded,
+                progress=lambda done, total: bar.progress(done / total, text=f"Reading page {done} of {total}…"),
+            )
+            bar.empty()
             st.session_state.uploaded_filename = uploaded.name
             st.session_state.uploaded_text = text
             st.success(f"✓ Loaded: {uploaded.name}")
@@ -80,7 +106,7 @@ def render_learn():
         )
 
     # ── ADAPTIVE BANNER ──
-    revision_queue = st.session_state.get("revision_queue", [])
+    revision_queue = st.session_state.revision_queue
     adaptation_triggered = st.session_state.get("adaptation_triggered", False)
     if adaptation_triggered and revision_queue:
         top_rev = revision_queue[0]
@@ -148,7 +174,7 @@ border-radius:12px;padding:0.875rem 1rem;margin-bottom:1rem;">
                         unsafe_allow_html=True)
 
         topic = st.text_input(
-            "",
+            "Topic to explain",
             placeholder="e.g. Explain Newton's Third Law, Summarise photosynthesis…",
             key="learn_topic", label_visibility="collapsed",
         )
@@ -163,15 +189,12 @@ border-radius:12px;padding:0.875rem 1rem;margin-bottom:1rem;">
 
         if ask_btn and topic.strip():
             current_style = st.session_state.get("learning_style", "stepbystep")
-            system = STYLE_SYSTEM[current_style]
-            weak_ctx = get_weak_context_string()
-            if weak_ctx:
-                system = system + f"\n\n{weak_ctx}"
+            system = system_blocks(STYLE_SYSTEM[current_style], get_weak_context_string())
             context = build_context_block(st.session_state.get("uploaded_text", ""), topic)
 
-            with st.spinner(f"BharatiyaAI thinking in {style_opts.get(current_style)} mode…"):
+            with ai_spinner(f"BharatiyaAI thinking in {style_opts.get(current_style)} mode…"):
                 if current_style == "flashcard":
-                    data = call_claude_json(system, context, max_tokens=1200)
+                    data = call_claude_json(system, context)
                     if data and isinstance(data, list):
                         st.session_state.fc_cards = data
                         st.session_state.fc_index = 0
@@ -184,11 +207,17 @@ border-radius:12px;padding:0.875rem 1rem;margin-bottom:1rem;">
                         set_tab("flashcards")
                         st.rerun()
                 else:
-                    text = call_claude(system, context, max_tokens=1200)
-                    if text.startswith("ERROR:AUTH"):
-                        st.error("Invalid API key. Add ANTHROPIC_API_KEY to .streamlit/secrets.toml")
-                    elif text.startswith("ERROR:"):
-                        st.error(f"API Error: {text}")
+                    # Stream tokens as they arrive, then swap in the styled card below
+                    live = st.empty()
+                    text, error = "", None
+                    try:
+                        with live.container():
+                            text = st.write_stream(stream_claude(system, context))
+                    except AIError as e:
+                        error = e
+                    live.empty()
+                    if error is not None:
+                        st.error(error.message)
                     else:
                         st.session_state.last_explanation = {
                             "text": text, "style": current_style, "topic": topic
@@ -245,7 +274,7 @@ border-left:3px solid {color};border-radius:14px;padding:1.5rem;margin-top:1.25r
 
 def _render_doubt_chat(style: str, style_opts: dict):
     doubt_history = st.session_state.get("doubt_history", [])
-    weak = st.session_state.get("weak_concepts", [])
+    weak = st.session_state.weak_concepts
 
     st.markdown(f"""
 <div style="background:rgba(255,107,43,0.04);border:1px solid rgba(255,107,43,0.12);
@@ -296,7 +325,7 @@ border-radius:12px;padding:0.875rem 1rem;margin-bottom:1rem;">
 
     # Input row
     doubt_input = st.text_input(
-        "",
+        "Your doubt",
         placeholder="Type your doubt… e.g. 'Why does entropy always increase?' or 'Explain recursion differently'",
         key="doubt_input", label_visibility="collapsed",
     )
@@ -318,30 +347,22 @@ border-radius:12px;padding:0.875rem 1rem;margin-bottom:1rem;">
         for h in history[-6:]:
             role = "user" if h["role"] == "user" else "assistant"
             messages.append({"role": role, "content": h["text"]})
-        messages.append({"role": "user", "content": doubt_input.strip()})
+        messages.append({"role": "user", "content": _doubt_turn(doubt_input.strip())})
         history.append({"role": "user", "text": doubt_input.strip()})
 
-        with st.spinner("BharatiyaAI solving your doubt…"):
+        with ai_spinner("BharatiyaAI solving your doubt…"):
             try:
-                from utils.ai import get_client
-                client = get_client()
-                response = client.messages.create(
-                    model="claude-opus-4-5",
-                    max_tokens=600,
-                    system=system,
-                    messages=messages,
-                )
-                ai_reply = response.content[0].text
+                ai_reply = st.write_stream(stream_claude(system, messages))
                 history.append({"role": "ai", "text": ai_reply, "style": current_style})
                 st.session_state.doubt_history = history
                 log_interaction("doubt", doubt_input.strip()[:40])
                 add_topic_studied(doubt_input.strip()[:40])
-            except Exception as e:
-                st.error(f"Error: {e}")
+            except AIError as e:
+                st.error(e.message)
         st.rerun()
 
     # Revision quick-fire buttons
-    revision_queue = st.session_state.get("revision_queue", [])
+    revision_queue = st.session_state.revision_queue
     if revision_queue:
         st.markdown("<br>", unsafe_allow_html=True)
         st.markdown(
@@ -361,23 +382,18 @@ border-radius:12px;padding:0.875rem 1rem;margin-bottom:1rem;">
                         "role": "user",
                         "text": f"I need to revise '{rev_topic}' — I'm weak on this."
                     })
-                    with st.spinner("Targeted revision loading…"):
+                    with ai_spinner("Targeted revision loading…"):
                         try:
-                            from utils.ai import get_client
-                            client = get_client()
-                            response = client.messages.create(
-                                model="claude-opus-4-5",
-                                max_tokens=500,
-                                system=system,
-                                messages=[{"role": "user",
-                                           "content": f"Targeted revision for weak topic: {rev_topic}"}],
-                            )
+                            ai_reply = st.write_stream(stream_claude(
+                                system,
+                                _doubt_turn(f"Targeted revision for weak topic: {rev_topic}"),
+                            ))
                             history.append({
                                 "role": "ai",
-                                "text": response.content[0].text,
+                                "text": ai_reply,
                                 "style": current_style
                             })
                             st.session_state.doubt_history = history
-                        except Exception as e:
-                            st.error(str(e))
+                        except AIError as e:
+                            st.error(e.message)
                     st.rerun()
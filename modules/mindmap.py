@@ -2,7 +2,7 @@
 
 import streamlit as st
 import math
-from utils.ai import call_claude_json, MINDMAP_SYSTEM
+from utils.ai import call_claude_json, ai_spinner, last_error_message, MINDMAP_SYSTEM
 from utils.pdf_reader import build_context_block
 
 
@@ -169,13 +169,14 @@ border-radius:14px;padding:1.5rem;margin-bottom:1.25rem;">
                 st.session_state.get("uploaded_text", ""),
                 week_topics or st.session_state.get("subject", "")
             )
-            with st.spinner("Generating mind map…"):
-                data = call_claude_json(MINDMAP_SYSTEM, context, max_tokens=800)
+            with ai_spinner("Generating mind map…"):
+                data = call_claude_json(MINDMAP_SYSTEM, context,
+                                        fresh=st.session_state.pop("mm_fresh", False))
             if data:
                 st.session_state.mindmap_data = data
                 st.rerun()
             else:
-                st.error("Could not generate mind map. Check your API key.")
+                st.error(last_error_message())
         return
 
     # Render SVG
@@ -211,4 +212,5 @@ border-radius:14px;padding:1.5rem;margin-bottom:1.25rem;">
     with c1:
         if st.button("🔄 Regenerate", key="mm_regen"):
             st.session_state.mindmap_data = None
+            st.session_state.mm_fresh = True     # next generation skips the cached map
             st.rerun()
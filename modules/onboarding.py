@@ -2,8 +2,12 @@
 
 import streamlit as st
 from utils.session import init_session
-from utils.ai import call_claude_json, CURRICULUM_SYSTEM
+from utils.ai import (
+    call_claude_json, map_bounded, ai_spinner, last_error_message,
+    CURRICULUM_SYSTEM, CURRICULUM_OUTLINE_SYSTEM, CURRICULUM_WEEK_SYSTEM,
+)
 from utils.pdf_reader import extract_text, build_context_block
+import json
 import math
 
 
@@ -34,6 +38,10 @@ EXAM_OPTIONS = {
     12: "12 Weeks (Semester)",
 }
 
+# Per-week detail calls run concurrently — one worker per week up to the longest plan
+# (map_bounded caps this at the admission controller's in-flight limit)
+CURRICULUM_WORKERS = max(EXAM_OPTIONS)
+
 
 def render_onboarding():
     step = st.session_state.get("onboard_step", 0)
@@ -83,7 +91,7 @@ def render_onboarding():
             '<div style="color:#6B7A99;font-size:0.9rem;margin-bottom:1.5rem;">Let\'s make this personal.</div>',
             unsafe_allow_html=True
         )
-        name = st.text_input("", placeholder="Enter your first name…", key="input_name",
+        name = st.text_input("Your name", placeholder="Enter your first name…", key="input_name",
                              label_visibility="collapsed")
         st.markdown("<br>", unsafe_allow_html=True)
         if st.button("Continue →", key="ob_step0", disabled=not name.strip()):
@@ -117,8 +125,12 @@ def render_onboarding():
                 st.session_state.subject = subj.strip()
                 st.session_state.syllabus_text = syllabus.strip()
                 if uploaded:
+                    bar = st.progress(0.0, text="Reading your material…")
                     st.session_state.uploaded_filename = uploaded.name
-                    st.session_state.uploaded_text = extract_text(uploaded)
+                    st.session_state.uploaded_text = extract_text(
+                        uploaded,
+                        progress=lambda done, total: bar.progress(done / total, text=f"Reading page {done} of {total}…"),
+                    )
                 st.session_state.onboard_step = 2
                 st.rerun()
 
@@ -213,7 +225,7 @@ border-radius:14px;padding:1.25rem;margin:1.25rem 0;">
 
 
 def _generate_curriculum():
-    with st.spinner("✦ BharatiyaAI is designing your personalized curriculum…"):
+    with ai_spinner("✦ BharatiyaAI is designing your personalized curriculum…"):
         weeks = st.session_state.exam_weeks
         style = st.session_state.learning_style
         style_name = STYLE_OPTIONS[style][1]
@@ -226,12 +238,13 @@ def _generate_curriculum():
             f"Syllabus/Topics:\n{st.session_state.syllabus_text}"
         )
 
-        data = call_claude_json(CURRICULUM_SYSTEM, user_msg, max_tokens=1500)
+        data = _generate_curriculum_parallel(user_msg)
+        if data is None:
+            # Fall back to the single-call curriculum
+            data = call_claude_json(CURRICULUM_SYSTEM, user_msg)
 
         if data is None:
-            st.session_state.onboard_error = (
-                "Could not generate curriculum. Please check your API key in secrets.toml."
-            )
+            st.session_state.onboard_error = f"Could not generate curriculum. {last_error_message()}"
             st.rerun()
             return
 
@@ -240,3 +253,59 @@ def _generate_curriculum():
         st.session_state.onboarded = True
         st.session_state.active_tab = "dashboard"
         st.rerun()
+
+
+def _generate_curriculum_parallel(user_msg: str) -> dict | None:
+    """
+    Two-phase curriculum: a small outline call for week themes, then one detail
+    call per week fanned out concurrently and merged into the CURRICULUM_SYSTEM shape.
+    A failed week is retried once, then filled in from the outline. Returns None
+    only if the outline fails, so the caller can fall back to the single call.
+    """
+    outline = call_claude_json(CURRICULUM_OUTLINE_SYSTEM, user_msg, max_tokens=700)
+    if not isinstance(outline, dict) or not outline.get("weeks"):
+        return None
+
+    outline_weeks = outline["weeks"]
+    outline_text = "\n".join(
+        f"Week {w.get('week', i + 1)}: {w.get('name', '')} — {w.get('theme', '')}"
+        for i, w in enumerate(outline_weeks)
+    )
+
+    def _detail(week: dict):
+        return call_claude_json(
+            CURRICULUM_WEEK_SYSTEM,
+            f"{user_msg}\n\nFull outline:\n{outline_text}\n\nWeek to detail:\n{json.dumps(week)}",
+            max_tokens=400,
+        )
+
+    details = map_bounded(_detail, outline_weeks, CURRICULUM_WORKERS)
+    # Retry only the weeks that failed; the ones that came back are kept
+    failed = [i for i, d in enumerate(details) if not isinstance(d, dict)]
+    if failed:
+        retried = map_bounded(_detail, [outline_weeks[i] for i in failed], CURRICULUM_WORKERS)
+        for i, detail in zip(failed, retried):
+            details[i] = detail
+
+    if any(not isinstance(d, dict) for d in details):
+        # map_bounded carried the workers' last failure back to this thread
+        st.toast(f"Some weeks were planned from the outline only. {last_error_message()}", icon="⚠️")
+
+    weeks = []
+    for i, (week, detail) in enumerate(zip(outline_weeks, details)):
+        if not isinstance(detail, dict):
+            # Still failing: fill the week from its outline entry rather than redoing everything
+            theme = week.get("theme", "")
+            detail = {"topics": [theme or week.get("name", f"Week {i + 1}")], "focus": theme}
+        weeks.append({
+            "week": week.get("week", i + 1),
+            "name": week.get("name", f"Week {i + 1}"),
+            "theme": week.get("theme", ""),
+            "topics": detail.get("topics", []),
+            "focus": detail.get("focus", ""),
+            "mode_tip": detail.get("mode_tip", ""),
+            "progress": 0,
+        })
+    outline["weeks"] = weeks
+    outline["total_weeks"] = len(weeks)
+    return outline
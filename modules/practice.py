@@ -1,9 +1,12 @@
 """BharatiyaAI × LearnOS — Practice Test Page"""
 
 import streamlit as st
-from utils.ai import call_claude_json, call_claude, PRACTICE_SYSTEM, FEEDBACK_SYSTEM
+from utils.ai import (
+    call_claude, call_claude_json, stream_claude_json, ai_spinner, AIError, PRACTICE_SYSTEM, FEEDBACK_SYSTEM
+)
 from utils.session import flag_weak, flag_strong
 from utils.pdf_reader import build_context_block
+from utils import prefetch
 
 
 def _get_week_info():
@@ -16,6 +19,51 @@ def _get_week_info():
     return "", ""
 
 
+def _render_question_preview(questions: list):
+    """List questions as they stream in, before the interactive test is built."""
+    rows = "".join(
+        f'<div style="font-size:0.85rem;padding:6px 0;border-bottom:1px solid rgba(255,255,255,0.05);">'
+        f'<span style="font-family:\'JetBrains Mono\',monospace;color:#6B7A99;">Q{i + 1}</span> '
+        f'{q.get("question", "")}</div>'
+        for i, q in enumerate(questions)
+    )
+    st.markdown(
+        f'<div style="background:rgba(17,28,56,0.95);border:1px solid rgba(255,255,255,0.07);'
+        f'border-radius:14px;padding:1rem 1.25rem;margin-bottom:1rem;">{rows}</div>',
+        unsafe_allow_html=True
+    )
+
+
+def _option_feedback(q: dict, option_idx: int, is_correct: bool) -> str | None:
+    """Feedback generated alongside the question for this option, or None if it's missing."""
+    feedback = q.get("feedback")
+    options = q.get("options", [])
+    if not isinstance(feedback, list) or len(feedback) != len(options):
+        return None
+    text = feedback[option_idx]
+    if not isinstance(text, str) or not text.strip():
+        return None
+    text = text.strip()
+    if not text.startswith(("✓", "✗")):
+        text = f"{'✓' if is_correct else '✗'} {text}"
+    return text
+
+
+def _generate_set(uploaded_text: str, topic: str) -> list:
+    """Whole-set generation for the background prefetcher (same prompt, same cache key)."""
+    data = call_claude_json(PRACTICE_SYSTEM, build_context_block(uploaded_text, topic))
+    return [q for q in data if isinstance(q, dict)] if isinstance(data, list) else []
+
+
+def _load_set(questions: list, topic: str):
+    st.session_state.practice_questions = questions
+    st.session_state.practice_topic = topic
+    st.session_state.practice_answers = {}
+    st.session_state.practice_feedbacks = {}
+    st.session_state.practice_revealed = {}
+    st.session_state.practice_generated = True
+
+
 def render_practice():
     week_name, week_topics = _get_week_info()
 
@@ -67,18 +115,24 @@ border-left:3px solid #FF6B2B;border-radius:14px;padding:1.5rem;margin-bottom:1.
                 topic_list
             )
 
-            with st.spinner("Crafting adaptive questions from your material…"):
-                data = call_claude_json(PRACTICE_SYSTEM, context, max_tokens=1400)
-
-            if data and isinstance(data, list):
-                st.session_state.practice_questions = data
-                st.session_state.practice_answers = {}
-                st.session_state.practice_feedbacks = {}
-                st.session_state.practice_revealed = {}
-                st.session_state.practice_generated = True
+            data, error = [], "Could not generate questions. Please try again."
+            preview = st.empty()
+            with ai_spinner("Crafting adaptive questions from your material…"):
+                try:
+                    for q in stream_claude_json(PRACTICE_SYSTEM, context,
+                                                fresh=st.session_state.pop("pq_fresh", False)):
+                        if isinstance(q, dict):
+                            data.append(q)
+                            with preview.container():
+                                _render_question_preview(data)
+                except AIError as e:
+                    data, error = [], e.message
+
+            if data:
+                _load_set(data, topic_list)
                 st.rerun()
             else:
-                st.error("Could not generate questions. Check your API key.")
+                st.error(error)
         return
 
     # ── QUESTIONS ──
@@ -104,8 +158,15 @@ border-left:3px solid #FF6B2B;border-radius:14px;padding:1.5rem;margin-bottom:1.
 
     st.markdown("<br>", unsafe_allow_html=True)
 
+    # Halfway through: start generating the next set in the background
+    if total_q and answered * 2 >= total_q:
+        next_topic = prefetch.next_study_topic(st.session_state.get("practice_topic", ""))
+        if next_topic:
+            prefetch.prefetch("practice", next_topic, _generate_set,
+                              st.session_state.get("uploaded_text", ""), next_topic)
+
     # Adaptive test banner
-    weak = st.session_state.get("weak_concepts", [])
+    weak = st.session_state.weak_concepts
     if weak:
         st.markdown(f"""
 <div style="background:rgba(255,107,43,0.04);border:1px solid rgba(255,107,43,0.12);
@@ -162,16 +223,20 @@ border-radius:16px;padding:1.5rem;margin-bottom:1.25rem;">
                     if attempted > 0:
                         st.session_state.session_score = round(correct_total / attempted * 100)
 
-                    # Get AI feedback
-                    with st.spinner("Getting feedback…"):
-                        fb_text = call_claude(
-                            FEEDBACK_SYSTEM,
-                            f"Question: {q.get('question')}\n"
-                            f"Student picked: {opt}\n"
-                            f"Correct answer: {options[correct_idx]}\n"
-                            f"Hint: {q.get('explanation', '')}",
-                            max_tokens=200,
-                        )
+                    # Feedback was generated with the question; only ask Claude if it's missing
+                    fb_text = _option_feedback(q, oi, is_correct)
+                    if fb_text is None:
+                        with ai_spinner("Getting feedback…"):
+                            fb_text = call_claude(
+                                FEEDBACK_SYSTEM,
+                                f"Question: {q.get('question')}\n"
+                                f"Student picked: {opt}\n"
+                                f"Correct answer: {options[correct_idx]}\n"
+                                f"Hint: {q.get('explanation', '')}",
+                            )
+                    if fb_text.startswith("ERROR:"):
+                        # Degrade to the explanation that came with the question
+                        fb_text = f"{'✓' if is_correct else '✗'} {q.get('explanation', '')}"
                     st.session_state.practice_feedbacks[qi] = {
                         "text": fb_text,
                         "correct": is_correct,
@@ -239,9 +304,20 @@ border-radius:20px;padding:2.5rem;text-align:center;margin-top:1rem;">
             if st.button("🔁 Try Again", use_container_width=True, key="pq_retry"):
                 st.session_state.practice_questions = []
                 st.session_state.practice_generated = False
+                st.session_state.pq_fresh = True     # a new set, not the cached one
                 st.rerun()
         with c3:
-            if st.button("New Topic Set", use_container_width=True, key="pq_new"):
-                st.session_state.practice_questions = []
-                st.session_state.practice_generated = False
+            next_topic = prefetch.peek("practice")
+            label = f"Next: {next_topic}" if next_topic else "New Topic Set"
+            if st.button(label, use_container_width=True, key="pq_new"):
+                questions = []
+                if next_topic:
+                    with ai_spinner("Loading your next set…"):
+                        next_topic, questions = prefetch.take("practice")
+                if questions:
+                    _load_set(questions, next_topic)
+                else:
+                    st.session_state.practice_questions = []
+                    st.session_state.practice_generated = False
+                    st.session_state.pq_fresh = True
                 st.rerun()
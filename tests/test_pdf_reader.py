@@ -0,0 +1,81 @@
+"""Page-at-a-time extraction — utils/pdf_reader.py"""
+
+import gc
+import io
+import tracemalloc
+
+import pytest
+
+from benchmarks.fixtures import make_pdf
+from utils import pdf_reader
+
+pytestmark = pytest.mark.skipif(pdf_reader._PdfReader is None, reason="needs PyPDF2 or pypdf")
+
+
+class Upload(io.BytesIO):
+    """Stand-in for Streamlit's UploadedFile: a BytesIO with a name."""
+
+    def __init__(self, data: bytes, name: str = "notes.pdf"):
+        super().__init__(data)
+        self.name = name
+
+
+def test_iter_pages_caps_pages():
+    upload = Upload(make_pdf(pages=6, words_per_page=40))
+    pages = list(pdf_reader.iter_pages(upload, max_pages=3))
+    assert [page_no for page_no, _ in pages] == [1, 2, 3]
+    assert all(text for _, text in pages)
+
+
+def test_iter_pages_stops_at_char_budget():
+    upload = Upload(make_pdf(pages=6, words_per_page=200))
+    pages = list(pdf_reader.iter_pages(upload, max_chars=1500))
+    assert sum(len(text) for _, text in pages) == 1500
+    assert len(pages) < 6
+
+
+def test_iter_pages_is_lazy():
+    calls = []
+    upload = Upload(make_pdf(pages=6, words_per_page=40))
+    pages = pdf_reader.iter_pages(upload, progress=lambda done, total: calls.append((done, total)))
+    assert next(pages)[0] == 1
+    pages.close()
+    assert calls == [(1, 6)]
+
+
+def test_parallel_early_exit_cancels_remaining_ranges(monkeypatch):
+    monkeypatch.setattr(pdf_reader, "PARALLEL_MIN_PAGES", 4)
+    monkeypatch.setattr(pdf_reader, "PARALLEL_WORKERS", 2)
+    serial = []
+    monkeypatch.setattr(pdf_reader, "_serial_pages", lambda *args: serial.append(args) or iter(()))
+    upload = Upload(make_pdf(pages=12, words_per_page=40))
+    pages = list(pdf_reader.iter_pages(upload, max_pages=10, max_chars=200))
+    assert [page_no for page_no, _ in pages] == [1]
+    assert [page_no for page_no, _ in pdf_reader.iter_pages(upload, max_pages=10)] == list(range(1, 11))
+    assert not serial       # served by the worker pool, not the serial fallback
+
+
+def test_extract_text_joins_iter_pages(monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_reader, "_extraction_cache", lambda: pdf_reader.TieredCache(
+        "extractions", memory_entries=4, disk_entries=0, directory=str(tmp_path)))
+    upload = Upload(make_pdf(pages=3, words_per_page=60))
+    expected = "".join(text for _, text in pdf_reader.iter_pages(upload)).strip()
+    assert pdf_reader.extract_text(upload) == expected
+    assert pdf_reader.extract_text(Upload(b"plain notes", "notes.txt"), max_chars=5) == "plain"
+
+
+def test_parallel_extraction_does_not_copy_the_upload(monkeypatch):
+    monkeypatch.setattr(pdf_reader, "PARALLEL_MIN_PAGES", 4)
+    monkeypatch.setattr(pdf_reader, "PARALLEL_WORKERS", 2)
+    data = make_pdf(pages=40, words_per_page=2000)
+    pdf_reader.extract_pages(data, max_chars=10)      # start the worker pool outside the measurement
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        pdf_reader.extract_pages(memoryview(data), max_chars=1000)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    # A bytes copy for the workers (or one pickled per page range) alone would exceed this
+    assert peak < len(data)
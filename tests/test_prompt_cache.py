@@ -0,0 +1,48 @@
+"""Prompt-cache breakpoints, checked against the usage the fake API reports — utils/ai.py"""
+
+import pytest
+
+from utils import ai
+from utils.fake_llm import FakeLLMServer
+
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    server = FakeLLMServer(port=0, latency="fixed:0", tokens_per_second=1e6)
+    monkeypatch.setattr(ai, "_base_url", lambda: server.url)
+    server.start()
+    ai._USAGE.clear()
+    yield server
+    server.stop()
+    ai._USAGE.clear()
+
+
+def _doubt_system(document_chars: int) -> list:
+    document = ("Uploaded material: osmosis moves water across a membrane. " * 500)[:document_chars]
+    return ai.system_blocks(ai.DOUBT_SOLVER_SYSTEM, "Student profile:\n- Name: Asha\n", document)
+
+
+def test_short_prefix_drops_the_breakpoint():
+    model = ai.ROUTES["doubt"]["model"]
+    assert not ai._cache_marked(ai._as_system(_doubt_system(1000), model))
+    assert ai._cache_marked(ai._as_system(_doubt_system(ai.prompt_cache_chars("doubt")), model))
+
+
+def test_per_model_minimum():
+    assert ai.prompt_cache_min_tokens("claude-opus-4-5") == 4096
+    assert ai.prompt_cache_min_tokens("claude-haiku-4-5") == 4096
+    assert ai.prompt_cache_min_tokens("claude-sonnet-4-5") == 1024
+
+
+def test_doubt_prefix_is_written_then_read(fake_api):
+    budget = ai.prompt_cache_chars("doubt") - len(ai.DOUBT_SOLVER_SYSTEM)
+    system = _doubt_system(budget)
+    for question in ("Why does water move?", "What is a semipermeable membrane?"):
+        assert not ai.call_claude(system, question).startswith("ERROR:")
+
+    row = ai.usage_stats()["doubt"]
+    assert row["cache_write_tokens"] > 0
+    assert row["cache_read_tokens"] > 0
+    assert row["cache_marked_calls"] == 2 and row["cache_hit_calls"] == 1
+    assert row["cache_skipped_calls"] == 0
+    assert fake_api.stats()["cache_reads"] == 1
@@ -0,0 +1,25 @@
+"""Reading the text out of a Messages API reply — utils/ai.py"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from utils import ai
+
+
+def _response(*blocks, stop_reason="end_turn"):
+    return SimpleNamespace(content=list(blocks), stop_reason=stop_reason)
+
+
+def test_takes_first_text_block():
+    thinking = SimpleNamespace(type="thinking", thinking="…")
+    reply = _response(thinking, SimpleNamespace(type="text", text="Osmosis is…"))
+    assert ai._reply_text(reply) == "Osmosis is…"
+
+
+@pytest.mark.parametrize("blocks", [(), (SimpleNamespace(type="tool_use", name="lookup"),)])
+def test_no_text_block_is_a_typed_error(blocks):
+    with pytest.raises(ai.AIEmptyReplyError) as err:
+        ai._reply_text(_response(*blocks, stop_reason="refusal"))
+    assert str(err.value) == "ERROR:EMPTY_REPLY"
+    assert isinstance(err.value, ai.AIError)
@@ -0,0 +1,78 @@
+"""Retries and admission — utils/resilience.py"""
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+
+import anthropic
+import httpx
+import pytest
+
+from utils import resilience
+from utils.resilience import AIRateLimitError, CircuitBreaker, acall_with_retries, call_with_retries
+
+
+class Slots:
+    """An admit() that records how many attempts were admitted and whether a slot is held."""
+
+    def __init__(self, refuse: bool = False):
+        self.admitted = 0
+        self.held = False
+        self.refuse = refuse
+
+    @contextmanager
+    def admit(self):
+        if self.refuse:
+            raise AIRateLimitError("ERROR:RATE_LIMIT")
+        self.admitted += 1
+        self.held = True
+        try:
+            yield
+        finally:
+            self.held = False
+
+    @asynccontextmanager
+    async def aadmit(self):
+        with self.admit():
+            yield
+
+
+def _flaky(failures: int):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise anthropic.APIConnectionError(request=httpx.Request("POST", "http://test/v1/messages"))
+        return "ok"
+    return fn
+
+
+def test_each_attempt_is_admitted_and_backoff_holds_no_slot(monkeypatch):
+    slots, held_while_sleeping = Slots(), []
+    monkeypatch.setattr(resilience.time, "sleep", lambda s: held_while_sleeping.append(slots.held))
+    assert call_with_retries(_flaky(2), CircuitBreaker(), attempts=4, admit=slots.admit) == "ok"
+    assert slots.admitted == 3
+    assert held_while_sleeping == [False, False]
+
+
+def test_async_attempts_are_admitted_separately(monkeypatch):
+    slots, held_while_sleeping = Slots(), []
+
+    async def no_sleep(seconds):
+        held_while_sleeping.append(slots.held)
+    monkeypatch.setattr(resilience.asyncio, "sleep", no_sleep)
+    fn = _flaky(1)
+
+    async def afn():
+        return fn()
+    assert asyncio.run(acall_with_retries(afn, CircuitBreaker(), attempts=3, admit=slots.aadmit)) == "ok"
+    assert slots.admitted == 2
+    assert held_while_sleeping == [False]
+
+
+def test_admission_failure_does_not_reach_the_breaker():
+    breaker = CircuitBreaker(threshold=1)
+    with pytest.raises(AIRateLimitError):
+        call_with_retries(_flaky(0), breaker, admit=Slots(refuse=True).admit)
+    assert breaker.stats()["consecutive_failures"] == 0
+    assert breaker.state == "closed"
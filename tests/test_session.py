@@ -0,0 +1,58 @@
+"""Saving learner state once a run — utils/session.py"""
+
+from collections import deque
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from utils.concepts import ConceptSet
+from utils.confidence import ConfidenceTable
+from utils.session import _snapshot, _unchanged
+
+SCRIPT = """
+import streamlit as st
+from utils.session import init_session, save_session, flag_weak
+init_session()
+if st.button("weak"):
+    flag_weak("Osmosis")
+save_session()
+"""
+
+
+def test_snapshot_follows_versions_and_top_level_edits():
+    concepts, table, answers, log = ConceptSet(["Osmosis"]), ConfidenceTable(), {0: 1}, deque(maxlen=3)
+    snapshots = [_snapshot(v) for v in (concepts, table, answers, log)]
+    assert all(_unchanged(s, v) for s, v in zip(snapshots, (concepts, table, answers, log)))
+
+    concepts.add("Diffusion")
+    table.ensure("Osmosis")["score"] = 60
+    answers[0] = 2
+    log.append({"event": "flashcard"})
+    assert not any(_unchanged(s, v) for s, v in zip(snapshots, (concepts, table, answers, log)))
+    assert not _unchanged(_snapshot([]), [])      # a replaced value is a change
+
+
+@pytest.fixture
+def enqueued(monkeypatch):
+    monkeypatch.setenv("LEARNER_STORE", "memory")
+    monkeypatch.setenv("LEARNER_JOURNAL_PATH", "none")
+    from utils import store
+    store.learner_store.clear()
+    store.event_journal.clear()
+    writes = []
+    original = store.WriteBehind.enqueue
+    monkeypatch.setattr(store.WriteBehind, "enqueue",
+                        lambda self, sid, changes: (writes.append(set(changes)), original(self, sid, changes)))
+    yield writes
+    store.learner_store.clear()
+    store.event_journal.clear()
+
+
+def test_only_changed_keys_are_queued(enqueued):
+    at = AppTest.from_string(SCRIPT).run()
+    assert len(enqueued) == 1                     # the new student's defaults, once
+    at.run()
+    assert len(enqueued) == 1                     # nothing changed
+    at.button[0].click().run()
+    assert enqueued[-1] >= {"weak_concepts", "revision_queue", "topic_confidence"}
+    assert "curriculum" not in enqueued[-1]
@@ -0,0 +1,38 @@
+"""Batched interaction journal — utils/store.py"""
+
+import os
+
+from utils.store import EventJournal
+
+
+def test_append_queues_and_flush_writes_one_batch(tmp_path):
+    path = tmp_path / "events.jsonl"
+    journal = EventJournal(str(path), interval=60)
+    for i in range(5):
+        journal.append("s1", {"type": "practice", "topic": f"Topic {i}", "correct": i % 2 == 0})
+    assert os.path.getsize(path) == 0                  # nothing written on the caller's thread
+    assert journal.stats()["pending"] == 5
+
+    journal.flush()
+    assert journal.stats() == {"appended": 5, "written": 5, "batches": 1, "errors": 0, "pending": 0}
+    assert [e["topic"] for e in journal.replay("s1")] == [f"Topic {i}" for i in range(5)]
+    journal.close()
+
+
+def test_replay_and_close_include_pending_events(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    journal = EventJournal(path, interval=60)
+    journal.append("s1", {"type": "flashcard", "topic": "Osmosis"})
+    assert [e["topic"] for e in journal.replay()] == ["Osmosis"]
+    journal.append("s2", {"type": "doubt", "topic": "Diffusion"})
+    journal.close()
+    assert [e["student"] for e in EventJournal(path).replay()] == ["s1", "s2"]
+
+
+def test_writer_thread_flushes_after_the_interval(tmp_path):
+    path = str(tmp_path / "events.jsonl")
+    journal = EventJournal(path, interval=0.01)
+    journal.append("s1", {"type": "learn", "topic": "Osmosis"})
+    journal._thread.join(timeout=0.5)                   # never exits; just give it a moment
+    assert journal.stats()["written"] == 1
+    journal.close()
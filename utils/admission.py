@@ -0,0 +1,166 @@
+"""Process-wide admission control for LLM calls — BharatiyaAI × LearnOS"""
+
+import asyncio
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from utils.resilience import AIRateLimitError
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` burst, refilled continuously at `per_minute`."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if they are now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate else float("inf")
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Ticket:
+    __slots__ = ("session", "seq", "tokens")
+
+    def __init__(self, session: str, seq: int, tokens: int):
+        self.session = session
+        self.seq = seq
+        self.tokens = tokens
+
+
+class AdmissionController:
+    """
+    Gate every upstream call through one place per server process:
+    request-per-minute and token-per-minute buckets, a bounded number of calls
+    in flight, and fair queueing — the next slot goes to the waiting session with
+    the fewest calls already in flight, oldest request first.
+    """
+
+    def __init__(self, requests_per_minute: int = 50, tokens_per_minute: int = 40000,
+                 max_in_flight: int = 8, queue_timeout: float = 90.0):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._in_flight = {}      # session -> calls in flight
+        self._total_in_flight = 0
+        self._stats = {"admitted": 0, "queued": 0, "timeouts": 0,
+                       "max_queue_depth": 0, "total_wait_seconds": 0.0}
+
+    def _order(self) -> list:
+        return sorted(self._waiting, key=lambda t: (self._in_flight.get(t.session, 0), t.seq))
+
+    @contextmanager
+    def slot(self, session: str, tokens: int, on_wait=None):
+        """
+        Hold an admission slot for the duration of one upstream call.
+        on_wait(position) is called whenever this caller's queue position changes.
+        Raises AIRateLimitError if no slot frees up within queue_timeout.
+        """
+        ticket = self._acquire(session, tokens, on_wait)
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    @asynccontextmanager
+    async def aslot(self, session: str, tokens: int):
+        """Async slot(): waits for admission on a worker thread so the event loop keeps running."""
+        waiting = asyncio.get_running_loop().run_in_executor(None, self._acquire, session, tokens, None)
+        try:
+            ticket = await asyncio.shield(waiting)
+        except asyncio.CancelledError:
+            # The worker may still be admitted after we gave up; hand the slot straight back
+            waiting.add_done_callback(lambda f: f.cancelled() or f.exception() or self._release(f.result()))
+            raise
+        try:
+            yield
+        finally:
+            self._release(ticket)
+
+    def _acquire(self, session: str, tokens: int, on_wait) -> _Ticket:
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        with self._cond:
+            ticket = _Ticket(session, next(self._seq), tokens)
+            self._waiting.append(ticket)
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._waiting))
+        last_position = None
+        admitted = queued = False
+        try:
+            while True:
+                report = None
+                with self._cond:
+                    position = self._order().index(ticket) + 1
+                    delay = 0.5
+                    if position == 1 and self._total_in_flight < self.max_in_flight:
+                        delay = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+                        if delay <= 0:
+                            self._admit(ticket, started, queued)
+                            admitted = True
+                            return ticket
+                    if time.monotonic() >= deadline:
+                        self._stats["timeouts"] += 1
+                        raise AIRateLimitError("ERROR:QUEUE_TIMEOUT")
+                    queued = True
+                    if on_wait and position != last_position:
+                        report = position
+                    else:
+                        self._cond.wait(min(delay, 0.5))
+                if report is not None:
+                    # Outside the lock: the callback renders UI, may be slow and may raise
+                    last_position = report
+                    on_wait(report)
+        finally:
+            if not admitted:
+                with self._cond:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+
+    def _admit(self, ticket: _Ticket, started: float, queued: bool):
+        """Move a ticket from the queue to in-flight. Caller holds self._cond."""
+        self._waiting.remove(ticket)
+        self._cond.notify_all()
+        self._requests.take(1)
+        self._tokens.take(ticket.tokens)
+        self._in_flight[ticket.session] = self._in_flight.get(ticket.session, 0) + 1
+        self._total_in_flight += 1
+        self._stats["admitted"] += 1
+        if queued:
+            self._stats["queued"] += 1
+        waited = time.monotonic() - started
+        self._stats["total_wait_seconds"] = round(self._stats["total_wait_seconds"] + waited, 3)
+
+    def _release(self, ticket: _Ticket):
+        with self._cond:
+            remaining = self._in_flight.get(ticket.session, 1) - 1
+            if remaining > 0:
+                self._in_flight[ticket.session] = remaining
+            else:
+                self._in_flight.pop(ticket.session, None)
+            self._total_in_flight -= 1
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._stats, "in_flight": self._total_in_flight, "waiting": len(self._waiting)}
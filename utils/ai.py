@@ -3,48 +3,624 @@ AI API wrapper — BharatiyaAI × LearnOS
 Calls Anthropic API (swap base_url for Amazon Bedrock in production)
 """
 
+import asyncio
+import contextvars
 import json
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+import httpx
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import anthropic
+from utils.cache import TieredCache, SingleFlight, content_key, DEFAULT_CACHE_DIR
+from utils.admission import AdmissionController
+from utils.resilience import (
+    AIError, AIAuthError, AIRateLimitError, AIUnavailableError, AICircuitOpenError, AIEmptyReplyError,
+    CircuitBreaker, call_with_retries, stream_with_retries, acall_with_retries,
+)
 
 
-def get_client():
-    """Return Anthropic client. Uses st.secrets or env var."""
-    api_key = None
+def _setting(name: str, default=None):
+    """Read a setting from st.secrets, falling back to the environment."""
+    value = None
     try:
-        api_key = st.secrets.get("ANTHROPIC_API_KEY")
+        value = st.secrets.get(name)
     except Exception:
         pass
-    if not api_key:
-        api_key = os.environ.get("ANTHROPIC_API_KEY", "")
-    return anthropic.Anthropic(api_key=api_key)
+    if value in (None, ""):
+        value = os.environ.get(name, default)
+    return value
+
+
+# ── CONNECTION POOL ──
+# Shared by every session in the server process. Override in secrets.toml or env.
+POOL_MAX_CONNECTIONS = int(_setting("AI_POOL_MAX_CONNECTIONS", 32))
+POOL_MAX_KEEPALIVE = int(_setting("AI_POOL_MAX_KEEPALIVE", 16))
+POOL_KEEPALIVE_EXPIRY = float(_setting("AI_POOL_KEEPALIVE_EXPIRY", 30.0))
+REQUEST_TIMEOUT = float(_setting("AI_REQUEST_TIMEOUT", 60.0))
+
+
+@st.cache_resource(show_spinner=False)
+def _inprocess_fake_llm() -> str:
+    from utils.fake_llm import FakeLLMServer
+    return FakeLLMServer.from_env(port=0).start()
+
+
+def _base_url() -> str | None:
+    """
+    AI_FAKE_LLM selects an offline stand-in (utils/fake_llm.py) for benchmarks:
+    unset → the real API, a URL → that server, "1" → one started inside this process.
+    """
+    fake = str(_setting("AI_FAKE_LLM", "") or "").strip()
+    if fake.lower() in ("", "0", "false", "no"):
+        return None
+    if fake.lower() in ("1", "true", "yes"):
+        return _inprocess_fake_llm()
+    return fake
+
+
+def _pool_limits(max_connections: int, max_keepalive: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+class _Clients:
+    """
+    Pooled clients per (API key, pool size, base URL), most recently used last.
+    Rotating the key builds a fresh client; the previous one stays open so calls
+    already in flight on it can finish, and anything older is closed with its pool.
+    """
+
+    def __init__(self, close, keep: int = 2):
+        self._close = close
+        self._keep = keep
+        self._lock = threading.Lock()
+        self._clients = OrderedDict()
+
+    def get(self, config: tuple, build):
+        with self._lock:
+            client = self._clients.get(config)
+            if client is not None:
+                self._clients.move_to_end(config)
+                return client
+            client = self._clients[config] = build(*config)
+            while len(self._clients) > self._keep:
+                self._close(self._clients.popitem(last=False)[1])
+            return client
+
+
+def _pooled_client(api_key: str, max_connections: int, max_keepalive: int,
+                   base_url: str | None = None) -> anthropic.Anthropic:
+    # The SDK's own httpx wrapper — it rejects bare httpx clients on some versions
+    http_client = anthropic.DefaultHttpxClient(
+        limits=_pool_limits(max_connections, max_keepalive), timeout=REQUEST_TIMEOUT,
+    )
+    # Retries are handled by utils.resilience, not stacked on top of the SDK's own
+    return anthropic.Anthropic(api_key=api_key, http_client=http_client, max_retries=0, base_url=base_url)
+
+
+@st.cache_resource(show_spinner=False)
+def _sync_clients() -> _Clients:
+    return _Clients(close=lambda client: client.close())
+
+
+def _pool_config() -> tuple:
+    base_url = _base_url()
+    api_key = _setting("ANTHROPIC_API_KEY", "") or ("fake-key" if base_url else "")
+    return api_key, POOL_MAX_CONNECTIONS, POOL_MAX_KEEPALIVE, base_url
+
+
+def get_client():
+    """Return the shared, connection-pooled Anthropic client. Uses st.secrets or env var."""
+    return _sync_clients().get(_pool_config(), _pooled_client)
+
+
+DEFAULT_MODEL = "claude-opus-4-5"    # swap → "anthropic.claude-3-sonnet-20240229-v1:0" on Bedrock
+FAST_MODEL = _setting("AI_FAST_MODEL", "claude-haiku-4-5")
+
+JSON_SUFFIX = "\n\nReturn ONLY valid JSON. No markdown. No explanation."
+
+
+# ── RESPONSE CACHE ──
+# Seconds a response stays valid, per prompt family. 0 disables caching.
+# Explicit regenerate actions pass fresh=True to skip the read and overwrite the entry.
+CACHE_TTL = {
+    "mindmap":    7 * 24 * 3600,
+    "curriculum": 24 * 3600,
+    "explain":    6 * 3600,
+    "flashcards": 3600,
+    "insights":   600,
+    "adaptation": 600,
+    "practice":   300,
+    "feedback":   120,
+    "doubt":      0,       # live chat — always answer fresh
+    "other":      0,
+}
+
+
+# ── MODEL ROUTING ──
+# Prompt family -> model and default max_tokens. Short, latency-critical calls go to
+# the fast model. Override per family with AI_MODEL_<FAMILY> / AI_MAX_TOKENS_<FAMILY>.
+_ROUTE_DEFAULTS = {
+    "feedback":   (FAST_MODEL,    200),
+    "mindmap":    (FAST_MODEL,    800),
+    "adaptation": (FAST_MODEL,    600),
+    "flashcards": (DEFAULT_MODEL, 1200),
+    "practice":   (DEFAULT_MODEL, 2600),    # questions carry per-option feedback
+    "curriculum": (DEFAULT_MODEL, 1500),
+    "insights":   (DEFAULT_MODEL, 900),
+    "explain":    (DEFAULT_MODEL, 1200),
+    "doubt":      (DEFAULT_MODEL, 600),
+    "other":      (DEFAULT_MODEL, 1200),
+}
+
+ROUTES = {
+    family: {
+        "model": _setting(f"AI_MODEL_{family.upper()}", model),
+        "max_tokens": int(_setting(f"AI_MAX_TOKENS_{family.upper()}", max_tokens)),
+    }
+    for family, (model, max_tokens) in _ROUTE_DEFAULTS.items()
+}
+
+# USD per million tokens: (input, output). Cache reads bill at 0.1×, cache writes at 1.25× input.
+MODEL_PRICES = {
+    "claude-opus-4-5":   (5.00, 25.00),
+    "claude-sonnet-4-5": (3.00, 15.00),
+    "claude-haiku-4-5":  (1.00, 5.00),
+}
+
+
+def route(system_prompt: str | list, max_tokens: int | None = None) -> tuple:
+    """Resolve (family, model, max_tokens) for a call; an explicit max_tokens wins over the route's."""
+    family = prompt_family(system_prompt)
+    entry = ROUTES.get(family, ROUTES["other"])
+    return family, entry["model"], max_tokens or entry["max_tokens"]
+
+
+def prompt_family(system_prompt: str | list) -> str:
+    """Classify a system prompt (string or blocks) by the static prompt it was built from."""
+    system_prompt = _system_text(system_prompt)
+    families = [
+        ("flashcards", STYLE_SYSTEM["flashcard"]),
+        ("explain",    STYLE_SYSTEM["stepbystep"]),
+        ("explain",    STYLE_SYSTEM["summary"]),
+        ("explain",    STYLE_SYSTEM["visual"]),
+        ("curriculum", CURRICULUM_SYSTEM),
+        ("curriculum", CURRICULUM_OUTLINE_SYSTEM),
+        ("curriculum", CURRICULUM_WEEK_SYSTEM),
+        ("practice",   PRACTICE_SYSTEM),
+        ("feedback",   FEEDBACK_SYSTEM),
+        ("doubt",      DOUBT_SOLVER_SYSTEM),
+        ("adaptation", ADAPTATION_SYSTEM),
+        ("mindmap",    MINDMAP_SYSTEM),
+        ("insights",   INSIGHTS_SYSTEM),
+    ]
+    for family, prompt in families:
+        if system_prompt.startswith(prompt):
+            return family
+    return "other"
+
+
+@st.cache_resource(show_spinner=False)
+def _response_cache() -> TieredCache:
+    return TieredCache(
+        "responses",
+        memory_entries=int(_setting("AI_CACHE_MEMORY_ENTRIES", 512)),
+        disk_entries=int(_setting("AI_CACHE_DISK_ENTRIES", 20000)),
+        directory=_setting("AI_CACHE_DIR", DEFAULT_CACHE_DIR),
+    )
+
+
+def _response_key(model: str, system_prompt: str | list, user_message: str | list, max_tokens: int) -> str:
+    return content_key(model, system_prompt, user_message, max_tokens)
+
+
+# ── PROMPT CACHING ──
+# System prompts are sent as up to three blocks — static instructions, per-document
+# context, per-student profile — with one breakpoint after the document block; the
+# profile changes turn to turn and stays outside. The provider silently skips caching
+# a prefix shorter than the routed model's minimum, so below it the breakpoint is
+# dropped. usage_stats() reports, from the usage the API returns, whether marked
+# prefixes were actually written to or read from the cache.
+PROMPT_CACHE_MIN_TOKENS = {
+    "claude-opus-4-5":   4096,
+    "claude-sonnet-4-5": 1024,
+    "claude-haiku-4-5":  4096,
+}
+DEFAULT_PROMPT_CACHE_MIN_TOKENS = 1024
+CHARS_PER_TOKEN = 4     # rough size estimate for prompts not yet sent
+
+
+def prompt_cache_min_tokens(model: str) -> int:
+    """Shortest prefix (in tokens) `model` will cache."""
+    return PROMPT_CACHE_MIN_TOKENS.get(model, DEFAULT_PROMPT_CACHE_MIN_TOKENS)
+
+
+def prompt_cache_chars(family: str) -> int:
+    """
+    Characters of instructions + document a prompt family needs before its routed
+    model will cache them — with headroom, since real prose runs a little over
+    CHARS_PER_TOKEN characters a token.
+    """
+    model = ROUTES.get(family, ROUTES["other"])["model"]
+    return prompt_cache_min_tokens(model) * CHARS_PER_TOKEN * 5 // 4
+
+
+def system_blocks(static: str, profile: str = "", document: str = "") -> list:
+    """Build a system prompt from its parts, with a cache breakpoint after the static + document prefix."""
+    prefix = [{"type": "text", "text": text} for text in (static, document) if text]
+    if prefix:
+        prefix[-1]["cache_control"] = {"type": "ephemeral"}
+    return prefix + ([{"type": "text", "text": profile}] if profile else [])
+
+
+def _as_system(system_prompt: str | list, model: str) -> list:
+    """Blocks as sent to `model`: breakpoints on a prefix shorter than its cache minimum are dropped."""
+    blocks = system_blocks(system_prompt) if isinstance(system_prompt, str) else system_prompt
+    sent, prefix_chars = [], 0
+    for block in blocks:
+        prefix_chars += len(block["text"])
+        if "cache_control" in block and prefix_chars // CHARS_PER_TOKEN < prompt_cache_min_tokens(model):
+            block = {k: v for k, v in block.items() if k != "cache_control"}
+        sent.append(block)
+    return sent
+
+
+def _cache_marked(system: list) -> bool:
+    return any("cache_control" in block for block in system)
+
+
+def _system_text(system_prompt: str | list) -> str:
+    """The static instruction text — the whole string, or the first block."""
+    if isinstance(system_prompt, str):
+        return system_prompt
+    return system_prompt[0]["text"] if system_prompt else ""
+
+
+def _with_json_suffix(system_prompt: str | list) -> str | list:
+    if isinstance(system_prompt, str):
+        return system_prompt + JSON_SUFFIX
+    blocks = [dict(b) for b in system_prompt]
+    blocks[0]["text"] += JSON_SUFFIX
+    return blocks
+
+
+_usage_lock = threading.Lock()
+_USAGE = {}     # family -> token counters
+
+
+def _call_cost(model: str, input_tokens: int, cache_read: int, cache_write: int, output_tokens: int) -> float:
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (price_in * (input_tokens + 0.1 * cache_read + 1.25 * cache_write)
+            + price_out * output_tokens) / 1_000_000
+
+
+def _record_usage(family: str, usage, model: str = DEFAULT_MODEL, latency: float = 0.0,
+                  marked: bool = False):
+    """
+    Accumulate tokens (cached vs. uncached), latency and estimated cost per route.
+    `marked` calls carried a cache breakpoint; one whose usage shows neither a cache
+    write nor a cache read was not cached by the provider.
+    """
+    if usage is None:
+        return
+    input_tokens = getattr(usage, "input_tokens", 0) or 0
+    cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    output_tokens = getattr(usage, "output_tokens", 0) or 0
+    with _usage_lock:
+        row = _USAGE.setdefault(family, {"calls": 0, "input_tokens": 0, "cache_read_tokens": 0,
+                                         "cache_write_tokens": 0, "output_tokens": 0,
+                                         "cache_marked_calls": 0, "cache_hit_calls": 0,
+                                         "cache_skipped_calls": 0,
+                                         "latency_seconds": 0.0, "max_latency_seconds": 0.0,
+                                         "cost_usd": 0.0})
+        row["model"] = model
+        row["calls"] += 1
+        row["input_tokens"] += input_tokens
+        row["cache_read_tokens"] += cache_read
+        row["cache_write_tokens"] += cache_write
+        row["output_tokens"] += output_tokens
+        if marked:
+            row["cache_marked_calls"] += 1
+            row["cache_hit_calls"] += cache_read > 0
+            row["cache_skipped_calls"] += not (cache_read or cache_write)
+        row["latency_seconds"] += latency
+        row["max_latency_seconds"] = max(row["max_latency_seconds"], latency)
+        row["cost_usd"] += _call_cost(model, input_tokens, cache_read, cache_write, output_tokens)
+
+
+def usage_stats() -> dict:
+    """
+    Per-route token usage, latency and estimated cost. cached_share is the fraction
+    of input served from the prompt cache; cache_skipped_calls counts calls with a
+    breakpoint that the provider neither wrote nor read. Latency includes queueing and retries.
+    """
+    with _usage_lock:
+        stats = {family: dict(row) for family, row in _USAGE.items()}
+    for row in stats.values():
+        total_in = row["input_tokens"] + row["cache_read_tokens"] + row["cache_write_tokens"]
+        row["cached_share"] = round(row["cache_read_tokens"] / total_in, 3) if total_in else 0.0
+        row["avg_latency_seconds"] = round(row["latency_seconds"] / row["calls"], 3)
+        row["latency_seconds"] = round(row["latency_seconds"], 3)
+        row["max_latency_seconds"] = round(row["max_latency_seconds"], 3)
+        row["cost_usd"] = round(row["cost_usd"], 6)
+    return stats
+
+
+def _as_messages(user_message: str | list) -> list:
+    """A plain string is a single user turn; a list is passed through as a full conversation."""
+    if isinstance(user_message, str):
+        return [{"role": "user", "content": user_message}]
+    return user_message
+
+
+def _reply_text(response) -> str:
+    """Text of the first text block; a reply without one (refusal, tool use, empty) is an AIEmptyReplyError."""
+    for block in getattr(response, "content", None) or ():
+        if getattr(block, "type", None) == "text":
+            return block.text
+    raise AIEmptyReplyError("ERROR:EMPTY_REPLY")
+
+
+# ── RESILIENCE ──
+RETRY_ATTEMPTS = int(_setting("AI_RETRY_ATTEMPTS", 4))
+RETRY_BASE_DELAY = float(_setting("AI_RETRY_BASE_DELAY", 0.5))
+RETRY_MAX_DELAY = float(_setting("AI_RETRY_MAX_DELAY", 8.0))
+
+_last_error = threading.local()
+
+
+@st.cache_resource(show_spinner=False)
+def _breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        threshold=int(_setting("AI_BREAKER_THRESHOLD", 5)),
+        cooldown=float(_setting("AI_BREAKER_COOLDOWN", 20.0)),
+    )
+
+
+def breaker_stats() -> dict:
+    return _breaker().stats()
+
+
+def last_error_message() -> str:
+    """Student-facing text for the most recent failed call on this thread."""
+    err = getattr(_last_error, "value", None)
+    return err.message if err is not None else AIError.message
+
+
+# ── ADMISSION CONTROL ──
+# One gate for every session in the process, so a whole class clicking at once
+# queues fairly instead of tripping the provider's rate limits.
+_queue_hook = threading.local()
+
+
+@st.cache_resource(show_spinner=False)
+def _admission() -> AdmissionController:
+    return AdmissionController(
+        requests_per_minute=int(_setting("AI_REQUESTS_PER_MINUTE", 50)),
+        tokens_per_minute=int(_setting("AI_TOKENS_PER_MINUTE", 40000)),
+        max_in_flight=int(_setting("AI_MAX_IN_FLIGHT", 8)),
+        queue_timeout=float(_setting("AI_QUEUE_TIMEOUT", 90.0)),
+    )
+
+
+def admission_stats() -> dict:
+    return _admission().stats()
+
+
+_async_session = contextvars.ContextVar("ai_session", default=None)
+# One shared [error] cell per run_async() call; tasks spawned inside it inherit the
+# same cell, so the latest failure travels back to the calling script thread.
+_async_error = contextvars.ContextVar("ai_error", default=None)
+
 
+def _session_id() -> str:
+    session = _async_session.get()
+    if session is not None:
+        return session
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "background"
 
-def call_claude(system_prompt: str, user_message: str, max_tokens: int = 1200) -> str:
-    """Call Claude and return raw text response."""
+
+def _estimate_tokens(system_prompt, user_message, max_tokens: int) -> int:
+    """Rough request size for the token bucket: CHARS_PER_TOKEN chars an input token plus the output cap."""
+    chars = len(json.dumps(system_prompt, ensure_ascii=False)) + len(json.dumps(user_message, ensure_ascii=False))
+    return chars // CHARS_PER_TOKEN + max_tokens
+
+
+@contextmanager
+def _admitted(system_prompt, user_message, max_tokens: int):
+    on_wait = getattr(_queue_hook, "value", None)
+    with _admission().slot(_session_id(), _estimate_tokens(system_prompt, user_message, max_tokens), on_wait):
+        yield
+
+
+@asynccontextmanager
+async def _aadmitted(system_prompt, user_message, max_tokens: int):
+    async with _admission().aslot(_session_id(), _estimate_tokens(system_prompt, user_message, max_tokens)):
+        yield
+
+
+@contextmanager
+def ai_spinner(text: str):
+    """st.spinner for AI calls; while a call is queued for admission, shows the queue position under it."""
+    status = st.empty()
+
+    def _on_wait(position: int):
+        status.caption(f"⏳ {text.rstrip('…')} — busy moment, you're #{position} in the queue")
+
+    _queue_hook.value = _on_wait
     try:
-        client = get_client()
-        response = client.messages.create(
-            model="claude-opus-4-5",          # swap → "anthropic.claude-3-sonnet-20240229-v1:0" on Bedrock
+        with st.spinner(text):
+            yield
+    finally:
+        _queue_hook.value = None
+        status.empty()
+
+
+def cache_stats() -> dict:
+    """Hit/miss/eviction counters for the response cache."""
+    return _response_cache().stats()
+
+
+# ── REQUEST COALESCING ──
+# Identical prompts already in flight (same response key) share one upstream call.
+
+class _Abandoned(AIError):
+    """The leading call never finished (e.g. its stream was closed); followers fetch for themselves."""
+
+
+@st.cache_resource(show_spinner=False)
+def _singleflight() -> SingleFlight:
+    return SingleFlight()
+
+
+def coalesce_stats() -> dict:
+    """How many calls led an upstream request vs. piggybacked on one already in flight."""
+    return _singleflight().stats()
+
+
+def _coalesced(key: str, fn):
+    """Run fn() once per key across concurrent callers; everyone gets the leader's result or error."""
+    while True:
+        leader, flight = _singleflight().begin(key)
+        if not leader:
+            try:
+                return flight.result()
+            except _Abandoned:
+                continue
+        try:
+            result = fn()
+        except BaseException as e:
+            _singleflight().finish(key, flight, error=e if isinstance(e, AIError) else _Abandoned("ERROR:ABANDONED"))
+            raise
+        _singleflight().finish(key, flight, result=result)
+        return result
+
+
+def call_claude(system_prompt: str | list, user_message: str | list, max_tokens: int | None = None,
+                fresh: bool = False) -> str:
+    """
+    Call Claude and return raw text response. The model and default max_tokens come
+    from the prompt family's route. Identical prompts are served from cache (unless
+    fresh=True, which refetches and replaces the cached reply), and identical
+    prompts already in flight share one upstream call.
+    Transient failures are retried with backoff; on failure returns an "ERROR:..." code.
+    """
+    _last_error.value = None
+    family, model, max_tokens = route(system_prompt, max_tokens)
+    ttl = CACHE_TTL.get(family, 0)
+    key = _response_key(model, system_prompt, user_message, max_tokens)
+    if ttl and not fresh:
+        cached = _response_cache().get(key)
+        if cached is not None:
+            return cached
+
+    system = _as_system(system_prompt, model)
+
+    def _create():
+        return get_client().messages.create(
+            model=model,
             max_tokens=max_tokens,
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_message}],
+            system=system,
+            messages=_as_messages(user_message),
         )
-        return response.content[0].text
-    except anthropic.AuthenticationError:
-        return "ERROR:AUTH"
-    except Exception as e:
-        return f"ERROR:{str(e)}"
 
+    def _fetch() -> str:
+        started = time.monotonic()
+        response = call_with_retries(_create, _breaker(), RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                                     admit=partial(_admitted, system_prompt, user_message, max_tokens))
+        _record_usage(family, getattr(response, "usage", None), model, time.monotonic() - started,
+                      _cache_marked(system))
+        text = _reply_text(response)
+        if ttl:
+            _response_cache().set(key, text, ttl)
+        return text
 
-def call_claude_json(system_prompt: str, user_message: str, max_tokens: int = 1200) -> dict | list | None:
-    """Call Claude expecting JSON. Strips markdown fences, parses safely."""
-    raw = call_claude(
-        system_prompt + "\n\nReturn ONLY valid JSON. No markdown. No explanation.",
-        user_message,
-        max_tokens,
-    )
+    try:
+        return _coalesced(key, _fetch)
+    except AIError as e:
+        _last_error.value = e
+        return str(e)
+
+
+def stream_claude(system_prompt: str | list, user_message: str | list, max_tokens: int | None = None,
+                  fresh: bool = False):
+    """
+    Stream Claude's reply as text deltas — feed straight into st.write_stream.
+    A cached reply (skipped when fresh=True), or one another caller is already
+    fetching, is yielded in one piece; a new one is cached once complete.
+    Raises a typed AIError on failure.
+    """
+    _last_error.value = None
+    family, model, max_tokens = route(system_prompt, max_tokens)
+    ttl = CACHE_TTL.get(family, 0)
+    key = _response_key(model, system_prompt, user_message, max_tokens)
+    if ttl and not fresh:
+        cached = _response_cache().get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    system = _as_system(system_prompt, model)
+
+    def _open_stream():
+        started = time.monotonic()
+        with get_client().messages.stream(
+            model=model,
+            max_tokens=max_tokens,
+            system=system,
+            messages=_as_messages(user_message),
+        ) as stream:
+            yield from stream.text_stream
+            _record_usage(family, stream.get_final_message().usage, model, time.monotonic() - started,
+                          _cache_marked(system))
+
+    # Join an identical call already in flight; its full reply arrives in one piece
+    while True:
+        leader, flight = _singleflight().begin(key)
+        if leader:
+            break
+        try:
+            yield flight.result()
+            return
+        except _Abandoned:
+            continue
+        except AIError as e:
+            _last_error.value = e
+            raise
+
+    parts = []
+    try:
+        for delta in stream_with_retries(_open_stream, _breaker(), RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                                         admit=partial(_admitted, system_prompt, user_message, max_tokens)):
+            parts.append(delta)
+            yield delta
+        text = "".join(parts)
+        if ttl:
+            _response_cache().set(key, text, ttl)
+        _singleflight().finish(key, flight, result=text)
+    except AIError as e:
+        _last_error.value = e
+        _singleflight().finish(key, flight, error=e)
+        raise
+    finally:
+        # Consumer closed the stream early (or the rerun interrupted it): followers fetch for themselves
+        _singleflight().finish(key, flight, error=_Abandoned("ERROR:ABANDONED"))
+
+
+def _parse_json_reply(system_prompt: str | list, user_message: str, max_tokens: int | None,
+                      raw: str) -> dict | list | None:
+    """Strip markdown fences and parse; a malformed reply is evicted from the cache."""
     if raw.startswith("ERROR:"):
         return None
     cleaned = raw.strip()
@@ -54,9 +630,278 @@ def call_claude_json(system_prompt: str, user_message: str, max_tokens: int = 12
     try:
         return json.loads(cleaned)
     except json.JSONDecodeError:
+        # Never keep serving a malformed answer from cache
+        _, model, max_tokens = route(system_prompt, max_tokens)
+        _response_cache().delete(_response_key(model, system_prompt, user_message, max_tokens))
         return None
 
 
+def call_claude_json(system_prompt: str | list, user_message: str, max_tokens: int | None = None,
+                     fresh: bool = False) -> dict | list | None:
+    """Call Claude expecting JSON. Strips markdown fences, parses safely."""
+    system_prompt = _with_json_suffix(system_prompt)
+    raw = call_claude(system_prompt, user_message, max_tokens, fresh)
+    return _parse_json_reply(system_prompt, user_message, max_tokens, raw)
+
+
+def iter_json_array(chunks):
+    """
+    Incrementally parse a top-level JSON array from text chunks, yielding each
+    element as soon as its closing brace/bracket (or trailing comma) arrives.
+    Anything before the opening "[" (e.g. a ```json fence) is skipped;
+    malformed elements are dropped.
+    """
+    buf = ""
+    pos = 0
+    start = None        # buffer index where the current element begins
+    depth = 0           # nesting depth inside the top-level array
+    opened = in_str = escaped = False
+
+    def _parse(text):
+        try:
+            return True, json.loads(text)
+        except json.JSONDecodeError:
+            return False, None
+
+    for chunk in chunks:
+        buf += chunk
+        while pos < len(buf):
+            ch = buf[pos]
+            if not opened:
+                opened = ch == "["
+            elif in_str:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_str = False
+            elif ch == '"':
+                in_str = True
+                if start is None:
+                    start = pos
+            elif ch in "{[":
+                if start is None:
+                    start = pos
+                depth += 1
+            elif ch in "}]":
+                if depth == 0:
+                    # End of the top-level array (flush a trailing scalar)
+                    if start is not None:
+                        ok, value = _parse(buf[start:pos])
+                        if ok:
+                            yield value
+                    return
+                depth -= 1
+                if depth == 0:
+                    ok, value = _parse(buf[start:pos + 1])
+                    if ok:
+                        yield value
+                    buf, pos, start = buf[pos + 1:], 0, None
+                    continue
+            elif ch == "," and depth == 0:
+                if start is not None:
+                    ok, value = _parse(buf[start:pos])
+                    if ok:
+                        yield value
+                buf, pos, start = buf[pos + 1:], 0, None
+                continue
+            elif start is None and not ch.isspace():
+                start = pos
+            pos += 1
+
+
+def stream_claude_json(system_prompt: str | list, user_message: str | list, max_tokens: int | None = None,
+                       fresh: bool = False):
+    """
+    Stream a JSON array response, yielding each element as soon as it is complete —
+    lets flashcard and practice pages show item 1 while the rest are generating.
+    Raises AIError on API failure.
+    """
+    system_prompt = _with_json_suffix(system_prompt)
+    chunks = stream_claude(system_prompt, user_message, max_tokens, fresh)
+    count = 0
+    for item in iter_json_array(chunks):
+        count += 1
+        yield item
+    for _ in chunks:
+        pass    # drain past the closing "]" so the full reply reaches the cache
+    if count == 0:
+        _, model, max_tokens = route(system_prompt, max_tokens)
+        _response_cache().delete(_response_key(model, system_prompt, user_message, max_tokens))
+
+
+def map_bounded(fn, items, max_workers: int = 4) -> list:
+    """
+    Run fn over items on a bounded thread pool and return results in input order.
+    Workers inherit the caller's Streamlit script context and ai_spinner queue hook,
+    and never outnumber the admission slots they would otherwise just wait on.
+    Afterwards last_error_message() on the calling thread reports the latest
+    failure from any worker.
+    """
+    items = list(items)
+    if not items:
+        return []
+    ctx = get_script_run_ctx()
+    on_wait = getattr(_queue_hook, "value", None)
+    errors = []
+
+    def _run(item):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        _queue_hook.value = on_wait
+        try:
+            return fn(item)
+        finally:
+            _queue_hook.value = None
+            if getattr(_last_error, "value", None) is not None:
+                errors.append(_last_error.value)
+
+    workers = min(max_workers, len(items), _admission().max_in_flight)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(_run, items))
+    _last_error.value = errors[-1] if errors else None
+    return results
+
+
+# ── ASYNC PATH ──
+# One event loop per server process, on its own daemon thread. Coroutines are
+# scheduled onto it with run_async(), so the script thread never runs (or nests)
+# an event loop itself. Cache, routing, coalescing, retries and admission are
+# shared with the sync path.
+
+@st.cache_resource(show_spinner=False)
+def _event_loop() -> asyncio.AbstractEventLoop:
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="ai-event-loop", daemon=True).start()
+    return loop
+
+
+def _pooled_async_client(api_key: str, max_connections: int, max_keepalive: int,
+                         base_url: str | None = None) -> anthropic.AsyncAnthropic:
+    http_client = anthropic.DefaultAsyncHttpxClient(
+        limits=_pool_limits(max_connections, max_keepalive), timeout=REQUEST_TIMEOUT,
+    )
+    return anthropic.AsyncAnthropic(api_key=api_key, http_client=http_client, max_retries=0, base_url=base_url)
+
+
+# Only touched on the loop thread, so an evicted client's close() is scheduled right there
+_async_clients = _Clients(close=lambda client: asyncio.ensure_future(client.close()))
+
+
+def get_async_client() -> anthropic.AsyncAnthropic:
+    """The shared, connection-pooled AsyncAnthropic client. Call from the AI event loop."""
+    return _async_clients.get(_pool_config(), _pooled_async_client)
+
+
+def run_async(coro):
+    """
+    Run a coroutine on the shared AI event loop and block until it finishes.
+    Safe from Streamlit's script thread; calls keep the caller's session for fair queueing.
+    """
+    loop = _event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_async() called from the AI event loop — await the coroutine instead")
+    session = _session_id()
+    error = [None]
+    _last_error.value = None
+
+    async def _bound():
+        _async_session.set(session)
+        _async_error.set(error)
+        return await coro
+
+    try:
+        return asyncio.run_coroutine_threadsafe(_bound(), loop).result()
+    finally:
+        # last_error_message() on this thread now reports what failed on the loop
+        _last_error.value = error[0]
+
+
+async def gather_bounded(fn, items, max_concurrency: int = 4) -> list:
+    """Await fn(item) for every item, at most max_concurrency at once; results in input order."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _one(item):
+        async with semaphore:
+            return await fn(item)
+
+    return list(await asyncio.gather(*(_one(item) for item in items)))
+
+
+async def _acoalesced(key: str, fn):
+    """_coalesced for coroutines; sync and async callers share the same in-flight calls."""
+    while True:
+        leader, flight = _singleflight().begin(key)
+        if not leader:
+            try:
+                # shield: a cancelled follower must not cancel the leader's Future
+                return await asyncio.shield(asyncio.wrap_future(flight))
+            except _Abandoned:
+                continue
+        try:
+            result = await fn()
+        except BaseException as e:
+            _singleflight().finish(key, flight, error=e if isinstance(e, AIError) else _Abandoned("ERROR:ABANDONED"))
+            raise
+        _singleflight().finish(key, flight, result=result)
+        return result
+
+
+async def acall_claude(system_prompt: str | list, user_message: str | list, max_tokens: int | None = None,
+                      fresh: bool = False) -> str:
+    """Async call_claude: same routing, cache and retries; on failure returns an "ERROR:..." code."""
+    family, model, max_tokens = route(system_prompt, max_tokens)
+    ttl = CACHE_TTL.get(family, 0)
+    key = _response_key(model, system_prompt, user_message, max_tokens)
+    if ttl and not fresh:
+        cached = _response_cache().get(key)
+        if cached is not None:
+            return cached
+
+    system = _as_system(system_prompt, model)
+
+    async def _create():
+        return await get_async_client().messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            system=system,
+            messages=_as_messages(user_message),
+        )
+
+    async def _fetch() -> str:
+        started = time.monotonic()
+        response = await acall_with_retries(_create, _breaker(), RETRY_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+                                            admit=partial(_aadmitted, system_prompt, user_message, max_tokens))
+        _record_usage(family, getattr(response, "usage", None), model, time.monotonic() - started,
+                      _cache_marked(system))
+        text = _reply_text(response)
+        if ttl:
+            _response_cache().set(key, text, ttl)
+        return text
+
+    try:
+        return await _acoalesced(key, _fetch)
+    except AIError as e:
+        cell = _async_error.get()
+        if cell is not None:
+            cell[0] = e
+        return str(e)
+
+
+async def acall_claude_json(system_prompt: str | list, user_message: str,
+                            max_tokens: int | None = None, fresh: bool = False) -> dict | list | None:
+    """Async call_claude_json."""
+    system_prompt = _with_json_suffix(system_prompt)
+    raw = await acall_claude(system_prompt, user_message, max_tokens, fresh)
+    return _parse_json_reply(system_prompt, user_message, max_tokens, raw)
+
+
 # ── SYSTEM PROMPTS ──
 
 STYLE_SYSTEM = {
@@ -105,6 +950,30 @@ Return JSON exactly:
   ]
 }"""
 
+CURRICULUM_OUTLINE_SYSTEM = """You are a world-class curriculum designer and academic coach for Indian students.
+Plan the week-by-week outline of a personalized study curriculum. Only the outline — topics come later.
+Return JSON exactly:
+{
+  "subject": "...",
+  "total_weeks": N,
+  "style_note": "one sentence on how this curriculum is personalized",
+  "overall_goal": "what the student will master by the end",
+  "weeks": [
+    {"week": 1, "name": "Week 1: Theme Title", "theme": "short description"}
+  ]
+}
+Produce exactly one entry per week until the exam. Themes must build on each other and not overlap."""
+
+CURRICULUM_WEEK_SYSTEM = """You are a world-class curriculum designer and academic coach for Indian students.
+You are given a student's profile, the full curriculum outline, and ONE week from it.
+Fill in that week only. Tailor it to the student's learning style and keep it distinct from the other weeks.
+Return JSON exactly:
+{
+  "topics": ["topic1", "topic2", "topic3"],
+  "focus": "specific skill or concept to master",
+  "mode_tip": "tip for this student's learning style this week"
+}"""
+
 PRACTICE_SYSTEM = """You are BharatiyaAI adaptive practice question engine for Indian university students.
 Create 5 multiple-choice questions. Return JSON array:
 [{
@@ -112,10 +981,14 @@ Create 5 multiple-choice questions. Return JSON array:
   "options": ["A. ...", "B. ...", "C. ...", "D. ..."],
   "answer": 0,
   "explanation": "why this answer is correct",
+  "feedback": ["✗ ...", "✓ ...", "✗ ...", "✗ ..."],
   "topic_tag": "which topic this tests",
   "difficulty": "easy|medium|hard"
 }]
 Answer field is 0-based index. Questions should be CBSE/university exam style.
+Feedback has one entry per option, in option order: what a student who picked that option should hear.
+Each is 2 kind, specific sentences starting with ✓ for the correct option or ✗ for a wrong one;
+for a wrong option, name the misconception behind it and end with one targeted revision tip.
 IMPORTANT: If student's weak areas are provided, generate at least 2 questions specifically targeting those weak topics.
 Vary difficulty: 1 easy (confidence builder), 3 medium, 1 hard (stretch)."""
 
@@ -0,0 +1,186 @@
+"""Two-tier (memory LRU + SQLite) cache for BharatiyaAI × LearnOS"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "bharatiya")
+
+
+def content_key(*parts) -> str:
+    """Stable SHA-256 key over any JSON-serialisable parts."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+class TieredCache:
+    """
+    Content-addressed cache with a bounded in-memory LRU in front of a bounded
+    SQLite file. Values must be JSON-serialisable. Every entry carries its own TTL.
+    If the disk tier cannot be opened (read-only box), the cache runs memory-only.
+    """
+
+    def __init__(self, name: str, memory_entries: int = 256, disk_entries: int = 5000,
+                 directory: str = DEFAULT_CACHE_DIR):
+        self.name = name
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                       "writes": 0, "evictions": 0}
+        self._db = None
+        if disk_entries > 0:
+            try:
+                os.makedirs(directory, exist_ok=True)
+                self._db = sqlite3.connect(os.path.join(directory, f"{name}.sqlite3"),
+                                           check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "key TEXT PRIMARY KEY, value TEXT, expires_at REAL, accessed_at REAL)"
+                )
+                self._db.commit()
+            except (OSError, sqlite3.Error):
+                self._db = None
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss or expiry."""
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return hit[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and row[1] > now:
+                        self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        value = json.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self._stats["disk_hits"] += 1
+                        return value
+                except (sqlite3.Error, ValueError):
+                    pass
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value, ttl: float):
+        """Store value for ttl seconds in both tiers."""
+        if ttl <= 0:
+            return
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._stats["writes"] += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at, now),
+                )
+                self._db.commit()
+                self._writes += 1
+                if self._writes % 64 == 0:
+                    self._prune_disk(now)
+            except sqlite3.Error:
+                pass
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._db.commit()
+                except sqlite3.Error:
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_size"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    # ── internals (caller holds the lock) ──
+
+    def _remember(self, key: str, expires_at: float, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _prune_disk(self, now: float):
+        """Drop expired rows, then the least recently used rows over the size bound."""
+        cur = self._db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        evicted = cur.rowcount
+        cur = self._db.execute(
+            "DELETE FROM entries WHERE key IN ("
+            "SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_entries,),
+        )
+        evicted += cur.rowcount
+        self._db.commit()
+        self._stats["evictions"] += max(evicted, 0)
+
+
+class SingleFlight:
+    """
+    Collapse concurrent work on the same key: the first caller (the leader) does it,
+    callers arriving while it is in flight wait on the leader's Future and share the result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    def begin(self, key: str) -> tuple:
+        """Return (is_leader, future). The leader must call finish() exactly once."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                return False, future
+            future = Future()
+            self._calls[key] = future
+            self._stats["leaders"] += 1
+            return True, future
+
+    def finish(self, key: str, future: Future, result=None, error: BaseException | None = None):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
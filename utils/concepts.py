@@ -0,0 +1,67 @@
+"""Ordered concept sets for the weak / strong / revision trackers — BharatiyaAI × LearnOS"""
+
+from itertools import islice
+
+
+class ConceptSet:
+    """
+    Insertion-ordered set of concept names. add / discard / `in` are O(1) (it is
+    a dict underneath) while iteration, indexing and slicing keep the order the
+    concepts were flagged in, so pages render it exactly like the old lists.
+    `version` counts changes, so savers can tell it was edited without encoding it.
+    """
+
+    __slots__ = ("_items", "version")
+
+    def __init__(self, items=()):
+        self._items = dict.fromkeys(c for c in items if c)
+        self.version = 0
+
+    def add(self, concept: str) -> bool:
+        """Append `concept` if new; returns whether it was added."""
+        if not concept or concept in self._items:
+            return False
+        self._items[concept] = None
+        self.version += 1
+        return True
+
+    def discard(self, concept: str) -> bool:
+        """Remove `concept` if present; returns whether it was there."""
+        removed = self._items.pop(concept, False) is None
+        self.version += removed
+        return removed
+
+    def __contains__(self, concept) -> bool:
+        return concept in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
+
+    def __getitem__(self, index):
+        # Only the leading items are ever displayed — islice avoids copying the rest
+        if isinstance(index, slice):
+            if (index.start or 0) >= 0 and (index.stop is None or index.stop >= 0):
+                return list(islice(self._items, index.start, index.stop, index.step))
+            return list(self._items)[index]
+        if index == 0 and self._items:
+            return next(iter(self._items))
+        return list(self._items)[index]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ConceptSet):
+            return list(self._items) == list(other._items)
+        if isinstance(other, list):
+            return list(self._items) == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ConceptSet({list(self._items)!r})"
+
+    def to_json(self) -> list:
+        return list(self._items)
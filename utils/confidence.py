@@ -0,0 +1,129 @@
+"""Compact per-topic confidence table — BharatiyaAI × LearnOS"""
+
+import sys
+from array import array
+
+STATUSES = ("weak", "learning", "strong")
+_STATUS_CODE = {name: code for code, name in enumerate(STATUSES)}
+_COUNTS = ("attempts", "correct", "fc_known", "fc_total")
+FIELDS = ("score",) + _COUNTS + ("status",)
+
+
+class TopicConfidence:
+    """
+    A view of one row, read and written like the old per-topic dict
+    (entry["score"], entry.get("status"), entry["attempts"] += 1).
+    """
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table, row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, field: str):
+        return self._table._read(self._row, field)
+
+    def __setitem__(self, field: str, value):
+        self._table._write(self._row, field, value)
+
+    def get(self, field: str, default=None):
+        return self._table._read(self._row, field) if field in FIELDS else default
+
+    def keys(self):
+        return FIELDS
+
+    def to_json(self) -> dict:
+        return {field: self[field] for field in FIELDS}
+
+    def __repr__(self) -> str:
+        return f"TopicConfidence({self.to_json()!r})"
+
+
+class ConfidenceTable:
+    """
+    Topic confidence as parallel typed arrays (score, attempts, correct, fc_known,
+    fc_total, status code) indexed by a row id from an interned topic-name table —
+    about 25 bytes of row data a topic instead of a six-key dict. Exposes the
+    mapping read API the pages use: `in`, len, get, [], keys and items. `version`
+    counts writes, so savers can tell it was edited without encoding it.
+    """
+
+    def __init__(self):
+        self._ids = {}              # topic -> row
+        self._names = []            # row -> topic
+        self._score = array("d")
+        self._counts = {field: array("I") for field in _COUNTS}
+        self._status = array("b")
+        self.version = 0
+
+    def ensure(self, topic: str, score: float = 50) -> TopicConfidence:
+        """The row for `topic`, added at a neutral `score` and "learning" status if new."""
+        row = self._ids.get(topic)
+        if row is None:
+            row = len(self._names)
+            topic = sys.intern(topic)
+            self._ids[topic] = row
+            self._names.append(topic)
+            self._score.append(score)
+            for column in self._counts.values():
+                column.append(0)
+            self._status.append(_STATUS_CODE["learning"])
+            self.version += 1
+        return TopicConfidence(self, row)
+
+    def _read(self, row: int, field: str):
+        if field == "score":
+            score = self._score[row]
+            return int(score) if score.is_integer() else score
+        if field == "status":
+            return STATUSES[self._status[row]]
+        return self._counts[field][row]
+
+    def _write(self, row: int, field: str, value):
+        self.version += 1
+        if field == "score":
+            self._score[row] = value
+        elif field == "status":
+            self._status[row] = _STATUS_CODE[value]
+        else:
+            self._counts[field][row] = value
+
+    def __contains__(self, topic) -> bool:
+        return topic in self._ids
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __bool__(self) -> bool:
+        return bool(self._names)
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __getitem__(self, topic: str) -> TopicConfidence:
+        return TopicConfidence(self, self._ids[topic])
+
+    def get(self, topic: str, default=None):
+        row = self._ids.get(topic)
+        return default if row is None else TopicConfidence(self, row)
+
+    def keys(self):
+        return list(self._names)
+
+    def items(self):
+        return ((name, TopicConfidence(self, row)) for row, name in enumerate(self._names))
+
+    def to_json(self) -> dict:
+        return {name: TopicConfidence(self, row).to_json() for row, name in enumerate(self._names)}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ConfidenceTable":
+        """Rebuild from the stored {topic: {field: value}} form (also the old session dicts)."""
+        table = cls()
+        for topic, fields in (data or {}).items():
+            entry = table.ensure(topic, fields.get("score", 50))
+            for field in _COUNTS:
+                entry[field] = int(fields.get(field, 0))
+            entry["status"] = fields.get("status", "learning")
+        return table
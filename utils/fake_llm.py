@@ -0,0 +1,357 @@
+"""
+Offline stand-in for the Anthropic Messages API — BharatiyaAI × LearnOS
+Deterministic, schema-valid canned replies for every prompt family, with a
+configurable latency distribution, SSE streaming and prompt-cache usage accounting,
+for load tests and benchmarks.
+
+    python -m utils.fake_llm --port 8765 --latency lognormal:0.6,0.5 --tps 80
+    AI_FAKE_LLM=http://127.0.0.1:8765 streamlit run app.py
+
+or AI_FAKE_LLM=1 to run one inside the Streamlit process.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.ai import CHARS_PER_TOKEN, prompt_cache_min_tokens, prompt_family
+
+COLORS = ["#FF6B2B", "#138808", "#F5C842", "#4A90D9", "#9B59B6"]
+
+
+# ── LATENCY ──
+
+def parse_latency(spec: str):
+    """
+    "fixed:S", "uniform:LO,HI" or "lognormal:MEDIAN,SIGMA" (seconds) →
+    a function rng -> seconds before the first token.
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(max(values[0], 1e-6))
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"bad latency spec: {spec!r}")
+
+
+# ── CANNED REPLIES ──
+
+def _topic(user_text: str) -> str:
+    """Best guess at the topic a request is about, from the context block conventions."""
+    for pattern in (r"Topic/Question:\s*(.+)", r"Topic asked:\s*(.+)", r"Topic:\s*(.+)",
+                    r"Subject:\s*(.+)"):
+        match = re.search(pattern, user_text)
+        if match and match.group(1).strip():
+            return match.group(1).strip()[:80]
+    return "the topic"
+
+
+def _weeks(user_text: str) -> int:
+    match = re.search(r"Weeks until exam:\s*(\d+)", user_text)
+    return max(1, min(int(match.group(1)), 16)) if match else 4
+
+
+def _curriculum(topic: str, weeks: int, outline_only: bool = False) -> dict:
+    plan = {
+        "subject": topic,
+        "total_weeks": weeks,
+        "style_note": f"Paced for steady progress through {topic}.",
+        "overall_goal": f"Exam-ready command of {topic}.",
+        "weeks": [],
+    }
+    for w in range(1, weeks + 1):
+        week = {"week": w, "name": f"Week {w}: {topic} part {w}", "theme": f"Core ideas of unit {w}"}
+        if not outline_only:
+            week.update(_week_detail(topic, w), progress=0)
+        plan["weeks"].append(week)
+    return plan
+
+
+def _week_detail(topic: str, week: int) -> dict:
+    return {
+        "topics": [f"{topic} {week}.{i}" for i in range(1, 4)],
+        "focus": f"Apply unit {week} concepts to exam problems",
+        "mode_tip": "Summarise each topic in your own words before moving on.",
+    }
+
+
+def _practice(topic: str, rng: random.Random) -> list:
+    questions = []
+    for i, difficulty in enumerate(["easy", "medium", "medium", "medium", "hard"]):
+        answer = rng.randrange(4)
+        questions.append({
+            "question": f"Which statement about {topic} (Q{i + 1}) is correct?",
+            "options": [f"{'ABCD'[o]}. Statement {o + 1} about {topic}" for o in range(4)],
+            "answer": answer,
+            "explanation": f"Statement {answer + 1} matches the definition.",
+            "feedback": [
+                f"✓ Right — statement {o + 1} is the definition. Well reasoned."
+                if o == answer else
+                f"✗ Statement {o + 1} mixes up two ideas. Revise the definition of {topic}."
+                for o in range(4)
+            ],
+            "topic_tag": topic,
+            "difficulty": difficulty,
+        })
+    return questions
+
+
+def _reply(family: str, system_text: str, user_text: str, rng: random.Random) -> str:
+    topic = _topic(user_text)
+    if family == "curriculum":
+        if "Fill in that week only" in system_text:
+            match = re.search(r'"week":\s*(\d+)', user_text)
+            return json.dumps(_week_detail(topic, int(match.group(1)) if match else 1))
+        return json.dumps(_curriculum(topic, _weeks(user_text), "Only the outline" in system_text))
+    if family == "flashcards":
+        return json.dumps([{"front": f"What is key idea {i} of {topic}?",
+                            "back": f"Key idea {i} of {topic}, stated precisely."} for i in range(1, 8)])
+    if family == "practice":
+        return json.dumps(_practice(topic, rng))
+    if family == "mindmap":
+        return json.dumps({"center": topic, "branches": [
+            {"name": f"Branch {b + 1}", "color": COLORS[b], "children": [f"Idea {b + 1}.{c}" for c in range(1, 4)]}
+            for b in range(5)
+        ]})
+    if family == "insights":
+        return json.dumps({
+            "headline": "Steady session with clear progress on the basics.",
+            "weekly_score": rng.randint(55, 90),
+            "recommendation": "Revisit your flagged topics with flashcards. Then take one more practice test.",
+            "strengths": ["Consistent practice", "Quick recall of definitions"],
+            "improvements": ["Multi-step problems", "Applying formulas"],
+            "next_action": "Do a 10-minute flashcard review of your weak topics.",
+            "topic_mastery": [{"name": topic, "score": rng.randint(40, 90), "status": "learning"}],
+        })
+    if family == "adaptation":
+        return json.dumps({
+            "should_adapt": True,
+            "reason": "Recent answers show gaps in foundational topics.",
+            "reorder_suggestion": ["Week 1", "Week 2"],
+            "priority_topics": [topic],
+            "recommended_mode": "flashcard",
+            "mode_reason": "Active recall closes definition gaps fastest.",
+            "revision_sessions": [{"topic": topic, "reason": "Missed questions", "suggested_mode": "flashcard"}],
+            "encouragement": "You're closer than you think — keep going!",
+        })
+    if family == "feedback":
+        return "✓ Good thinking — that matches the definition. Keep linking ideas like this."
+    if family == "doubt":
+        return (f"Good question about {topic}. Think of it as a chain of cause and effect. "
+                "Each step follows from the previous one. Want me to explain the next concept?")
+    return "\n".join([f"**{topic}** — quick walkthrough:", ""] +
+                     [f"{i}. Step {i}: one clear idea about {topic}." for i in range(1, 7)])
+
+
+# ── SERVER ──
+
+class FakeLLMServer:
+    """Threaded HTTP server speaking just enough of POST /v1/messages for the app's client."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, latency: str = "lognormal:0.6,0.5",
+                 tokens_per_second: float = 80.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.seed = seed
+        self._lock = threading.Lock()
+        # Failures are drawn per attempt from one server-wide stream, so — like a real
+        # 529 — a retry of the same request can succeed; replies stay per-request deterministic.
+        self._faults = random.Random(seed)
+        self._stats = {"requests": 0, "streams": 0, "errors": 0, "cache_writes": 0, "cache_reads": 0}
+        self._cached_prefixes = set()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+
+    @classmethod
+    def from_env(cls, **overrides) -> "FakeLLMServer":
+        settings = {
+            "latency": os.environ.get("FAKE_LLM_LATENCY", "lognormal:0.6,0.5"),
+            "tokens_per_second": float(os.environ.get("FAKE_LLM_TPS", 80)),
+            "error_rate": float(os.environ.get("FAKE_LLM_ERROR_RATE", 0)),
+            "seed": int(os.environ.get("FAKE_LLM_SEED", 0)),
+        }
+        settings.update(overrides)
+        return cls(**settings)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        """Serve on a daemon thread; returns the base URL."""
+        threading.Thread(target=self.httpd.serve_forever, name="fake-llm", daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            return self._faults.random() < self.error_rate
+
+    def reset_prompt_cache(self):
+        """Forget every cached prefix, as if the cache TTL had passed."""
+        with self._lock:
+            self._cached_prefixes.clear()
+
+    def _cache_usage(self, model: str, system) -> tuple:
+        """
+        (cache_creation, cache_read) tokens for a request, as the API reports them: a
+        prefix up to the last cache_control block, at least the model's minimum, is
+        written the first time and read after that.
+        """
+        if isinstance(system, str):
+            return 0, 0
+        marked = [i for i, block in enumerate(system) if "cache_control" in block]
+        if not marked:
+            return 0, 0
+        prefix = "".join(block.get("text", "") for block in system[:marked[-1] + 1])
+        tokens = len(prefix) // CHARS_PER_TOKEN
+        if tokens < prompt_cache_min_tokens(model):
+            return 0, 0
+        key = hashlib.sha256(f"{model}\0{prefix}".encode("utf-8")).digest()
+        with self._lock:
+            if key in self._cached_prefixes:
+                self._stats["cache_reads"] += 1
+                return 0, tokens
+            self._cached_prefixes.add(key)
+            self._stats["cache_writes"] += 1
+            return tokens, 0
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/stats":
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": "Not found"}})
+
+            def do_POST(self):
+                if not self.path.split("?")[0].endswith("/v1/messages"):
+                    self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": "Not found"}})
+                    return
+                raw = self.rfile.read(int(self.headers.get("content-length", 0) or 0))
+                body = json.loads(raw or b"{}")
+                # Same request → same latency and reply; whether it fails is drawn per attempt
+                rng = random.Random(f"{server.seed}:{hashlib.sha256(raw).hexdigest()}")
+                server._count("requests")
+                time.sleep(server.latency(rng))
+                if server._should_fail():
+                    server._count("errors")
+                    self._send_json(529, {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}})
+                    return
+
+                system = body.get("system", "")
+                system_text = system if isinstance(system, str) else (system[0].get("text", "") if system else "")
+                messages = body.get("messages", [])
+                content = messages[-1].get("content", "") if messages else ""
+                user_text = content if isinstance(content, str) else " ".join(
+                    part.get("text", "") for part in content if isinstance(part, dict))
+                text = _reply(prompt_family(system_text), system_text, user_text, rng)
+                model = body.get("model", "fake")
+                cache_write, cache_read = server._cache_usage(model, system)
+                usage = {"input_tokens": max(len(raw) // CHARS_PER_TOKEN - cache_write - cache_read, 1),
+                         "output_tokens": len(text) // CHARS_PER_TOKEN + 1,
+                         "cache_creation_input_tokens": cache_write, "cache_read_input_tokens": cache_read}
+                if body.get("stream"):
+                    server._count("streams")
+                    self._stream(text, usage, model)
+                else:
+                    time.sleep(usage["output_tokens"] / server.tokens_per_second)
+                    self._send_json(200, {
+                        "id": "msg_fake", "type": "message", "role": "assistant", "model": model,
+                        "content": [{"type": "text", "text": text}],
+                        "stop_reason": "end_turn", "stop_sequence": None, "usage": usage,
+                    })
+
+            def _send_json(self, status: int, payload: dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _event(self, name: str, payload: dict):
+                data = f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _stream(self, text: str, usage: dict, model: str):
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("transfer-encoding", "chunked")
+                self.end_headers()
+                self._event("message_start", {"type": "message_start", "message": {
+                    "id": "msg_fake", "type": "message", "role": "assistant", "model": model, "content": [],
+                    "stop_reason": None, "stop_sequence": None, "usage": {**usage, "output_tokens": 1},
+                }})
+                self._event("content_block_start", {"type": "content_block_start", "index": 0,
+                                                    "content_block": {"type": "text", "text": ""}})
+                step = 12   # ~3 tokens per delta
+                for i in range(0, len(text), step):
+                    time.sleep(3 / server.tokens_per_second)
+                    self._event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                        "delta": {"type": "text_delta", "text": text[i:i + step]}})
+                self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+                self._event("message_delta", {"type": "message_delta",
+                                              "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                              "usage": {"output_tokens": usage["output_tokens"]}})
+                self._event("message_stop", {"type": "message_stop"})
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline fake Anthropic Messages API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default=os.environ.get("FAKE_LLM_LATENCY", "lognormal:0.6,0.5"),
+                        help='time to first token: "fixed:S", "uniform:LO,HI" or "lognormal:MEDIAN,SIGMA"')
+    parser.add_argument("--tps", type=float, default=float(os.environ.get("FAKE_LLM_TPS", 80)),
+                        help="output tokens per second")
+    parser.add_argument("--error-rate", type=float, default=float(os.environ.get("FAKE_LLM_ERROR_RATE", 0)),
+                        help="fraction of requests answered with 529 overloaded")
+    parser.add_argument("--seed", type=int, default=int(os.environ.get("FAKE_LLM_SEED", 0)))
+    args = parser.parse_args()
+    server = FakeLLMServer(args.host, args.port, args.latency, args.tps, args.error_rate, args.seed)
+    print(f"Fake LLM listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,252 @@
 """PDF & file text extraction for BharatiyaAI"""
 
+import functools
+import hashlib
 import io
+import math
+import os
+import multiprocessing
+import re
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
+from utils.cache import TieredCache, DEFAULT_CACHE_DIR
 
-def extract_text(uploaded_file) -> str:
-    """Extract text from uploaded PDF or TXT file."""
+# PDF backend chosen once: PyPDF2, falling back to pypdf. None if neither is installed.
+try:
+    from PyPDF2 import PdfReader as _PdfReader
+except ImportError:
+    try:
+        from pypdf import PdfReader as _PdfReader
+    except ImportError:
+        _PdfReader = None
+
+# ── EXTRACTION CACHE ──
+# Keyed by a hash of the uploaded bytes, so the same syllabus PDF is parsed once per box.
+EXTRACTION_TTL = 30 * 24 * 3600
+_EXTRACT_STATS = {"hits": 0, "misses": 0, "last_seconds": 0.0, "total_seconds": 0.0}
+
+# ── PARALLEL EXTRACTION ──
+# PDFs with at least this many pages are split into page ranges across worker processes.
+PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 48))
+PARALLEL_WORKERS = int(os.environ.get("PDF_PARALLEL_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Upper bound on text kept from one upload; extraction stops once it is reached.
+MAX_UPLOAD_CHARS = int(os.environ.get("PDF_MAX_CHARS", 2_000_000))
+
+# ── RETRIEVAL ──
+CHUNK_CHARS = 800
+CHUNK_OVERLAP = 100
+_TOKEN_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how in into is it its of on or "
+    "that the their this to was were what when where which who why will with explain "
+    "topic question summarise summarize".split()
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _extraction_cache() -> TieredCache:
+    return TieredCache(
+        "extractions",
+        memory_entries=32,
+        disk_entries=500,
+        directory=os.environ.get("AI_CACHE_DIR", DEFAULT_CACHE_DIR),
+    )
+
+
+def extraction_stats() -> dict:
+    """Hit/miss counts and time spent parsing on misses."""
+    stats = dict(_EXTRACT_STATS)
+    stats["cache"] = _extraction_cache().stats()
+    return stats
+
+
+class _ViewStream(io.RawIOBase):
+    """Seekable read-only stream over a memoryview, so the PDF backend parses the upload in place."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def _read_upload(uploaded_file) -> memoryview:
+    """
+    Read the upload without copying it. Streamlit's UploadedFile is a BytesIO, so
+    getbuffer() hands back a zero-copy view of the bytes it already holds.
+    """
+    if hasattr(uploaded_file, "getbuffer"):
+        return uploaded_file.getbuffer()
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+    return memoryview(uploaded_file.read())
+
+
+def extract_text(uploaded_file, progress=None, max_chars: int = MAX_UPLOAD_CHARS) -> str:
+    """
+    Extract text from uploaded PDF or TXT file, up to max_chars.
+    Repeat uploads are served from cache. progress(done, total) is called as pages finish.
+    """
     if uploaded_file is None:
         return ""
 
     name = uploaded_file.name.lower()
+    if not name.endswith((".txt", ".pdf")):
+        return ""
+    if name.endswith(".pdf") and _PdfReader is None:
+        return f"[PDF uploaded: {uploaded_file.name}. Text extraction requires PyPDF2. Claude will use topic context.]"
 
+    data = _read_upload(uploaded_file)
+    key = f"{name.rsplit('.', 1)[-1]}:{max_chars}:{hashlib.sha256(data).hexdigest()}"
+    cached = _extraction_cache().get(key)
+    if cached is not None:
+        _EXTRACT_STATS["hits"] += 1
+        return cached["text"]
+
+    started = time.perf_counter()
+    try:
+        text = "".join(text for _, text in iter_pages(uploaded_file, max_chars=max_chars, progress=progress))
+        ok = True
+    except Exception as e:
+        # Placeholder / error text is shown to Claude but never cached
+        text, ok = ("" if name.endswith(".txt") else f"[PDF: {uploaded_file.name} — extraction failed: {e}]"), False
+    if ok and name.endswith(".pdf"):
+        text = text.strip()
+    elapsed = time.perf_counter() - started
+    _EXTRACT_STATS["misses"] += 1
+    _EXTRACT_STATS["last_seconds"] = round(elapsed, 3)
+    _EXTRACT_STATS["total_seconds"] = round(_EXTRACT_STATS["total_seconds"] + elapsed, 3)
+    if ok:
+        _extraction_cache().set(key, {"text": text, "seconds": round(elapsed, 3)}, EXTRACTION_TTL)
+    return text
+
+
+def iter_pages(uploaded_file, max_pages: int | None = None, max_chars: int | None = None,
+               progress=None):
+    """
+    Lazily yield (page_no, text) from an uploaded PDF or TXT file, one page at a time.
+    Stops after max_pages pages or once max_chars characters have been yielded, so a
+    huge upload never has to be fully materialised; closing the generator early
+    stops any extraction still pending. A TXT file is a single page.
+    """
+    if uploaded_file is None:
+        return
+    name = uploaded_file.name.lower()
     if name.endswith(".txt"):
-        try:
-            return uploaded_file.read().decode("utf-8", errors="ignore")
-        except Exception:
-            return ""
-
-    elif name.endswith(".pdf"):
-        try:
-            import PyPDF2
-            reader = PyPDF2.PdfReader(io.BytesIO(uploaded_file.read()))
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
-            return text.strip()
-        except ImportError:
-            # Fallback: try pypdf
+        text = str(_read_upload(uploaded_file), "utf-8", errors="ignore")
+        yield 1, text[:max_chars] if max_chars is not None else text
+    elif name.endswith(".pdf") and _PdfReader is not None:
+        yield from _iter_pdf_pages(_read_upload(uploaded_file), max_pages, max_chars, progress)
+
+
+def _iter_pdf_pages(data, max_pages: int | None = None, max_chars: int | None = None, progress=None):
+    """
+    Yield (page_no, text) in page order within the page and character limits.
+    Large PDFs are split into page ranges across a process pool and handed out as
+    each range lands; small ones (or a broken pool) are parsed serially.
+    """
+    data = memoryview(data)
+    reader = _PdfReader(_ViewStream(data))
+    total = len(reader.pages)
+    if max_pages is not None:
+        total = min(total, max_pages)
+    if total < PARALLEL_MIN_PAGES or PARALLEL_WORKERS < 2:
+        pages = _serial_pages(reader, 0, total)
+    else:
+        pages = _parallel_pages(data, reader, total)
+    budget = max_chars
+    try:
+        for page_no, text in pages:
+            if budget is not None:
+                text = text[:budget]
+                budget -= len(text)
+            if progress:
+                progress(page_no, total)
+            yield page_no, text
+            if budget is not None and budget <= 0:
+                return
+    finally:
+        pages.close()       # cancels page ranges nobody will read
+
+
+def _serial_pages(reader, start: int, stop: int):
+    for i in range(start, stop):
+        yield i + 1, reader.pages[i].extract_text() or ""
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> list:
+    """Worker entry point: [(page_no, text)] for pages [start, stop) of the spooled PDF, 1-based."""
+    with open(path, "rb") as fh:
+        reader = _PdfReader(fh)
+        return [(i + 1, reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+
+@functools.lru_cache(maxsize=1)
+def _process_pool() -> ProcessPoolExecutor:
+    # spawn, not fork: the Streamlit server is multi-threaded
+    return ProcessPoolExecutor(max_workers=PARALLEL_WORKERS,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+def _parallel_pages(data: memoryview, reader, total: int):
+    """Pages [0, total) from worker processes, in order; falls back to the parent on a broken pool."""
+    # Workers all read one temp file written straight from the view — the parent
+    # never copies the upload, and no range is sent a pickled copy of the bytes
+    spool_path = None
+    futures, done = [], 0
+    try:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as fh:
+            spool_path = fh.name
+            fh.write(data)
+        # A couple of ranges per worker evens out pages of uneven density
+        step = math.ceil(total / (PARALLEL_WORKERS * 2))
+        futures = [
+            _process_pool().submit(_extract_page_range, spool_path, start, min(total, start + step))
+            for start in range(0, total, step)
+        ]
+        for future in futures:
+            for page_no, text in future.result():
+                done = page_no
+                yield page_no, text
+    except (OSError, BrokenProcessPool):
+        _process_pool.cache_clear()
+        yield from _serial_pages(reader, done, total)
+    finally:
+        for future in futures:
+            future.cancel()
+        if spool_path:
             try:
-                from pypdf import PdfReader
-                reader = PdfReader(io.BytesIO(uploaded_file.read()))
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() or ""
-                return text.strip()
-            except ImportError:
-                return f"[PDF uploaded: {uploaded_file.name}. Text extraction requires PyPDF2. Claude will use topic context.]"
-        except Exception as e:
-            return f"[PDF: {uploaded_file.name} — extraction failed: {e}]"
+                os.unlink(spool_path)
+            except OSError:
+                pass
+
 
-    return ""
+def extract_pages(data, max_chars: int | None = None, progress=None) -> list:
+    """[(page_no, text)] for a whole PDF held in memory, stopping once max_chars is reached."""
+    return list(_iter_pdf_pages(data, max_chars=max_chars, progress=progress))
 
 
 def truncate_context(text: str, max_chars: int = 3000) -> str:
@@ -48,6 +256,94 @@ def truncate_context(text: str, max_chars: int = 3000) -> str:
     return text[:max_chars] + f"\n\n[...document truncated at {max_chars} chars...]"
 
 
+def _tokenize(text: str) -> list:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def chunk_text(text: str, size: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> list:
+    """Split text into ~size-char chunks on whitespace boundaries, with a small overlap."""
+    chunks = []
+    start, n = 0, len(text)
+    while start < n:
+        end = min(n, start + size)
+        if end < n:
+            cut = max(text.rfind(" ", start + size // 2, end), text.rfind("\n", start + size // 2, end))
+            if cut != -1:
+                end = cut
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= n:
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+class DocumentIndex:
+    """Okapi BM25 inverted index over the chunks of one uploaded document."""
+
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self, text: str):
+        self.chunks = chunk_text(text)
+        self.lengths = []
+        self.postings = {}    # term -> [(chunk_id, term_frequency)]
+        for cid, chunk in enumerate(self.chunks):
+            counts = Counter(_tokenize(chunk))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((cid, tf))
+        n = len(self.chunks)
+        self.avg_len = (sum(self.lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self.postings.items()
+        }
+
+    def search(self, query: str) -> list:
+        """Return [(score, chunk_id)] for chunks sharing a term with the query, best first."""
+        scores = {}
+        for term in set(_tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for cid, tf in self.postings[term]:
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[cid] / (self.avg_len or 1))
+                scores[cid] = scores.get(cid, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return sorted(((s, cid) for cid, s in scores.items()), reverse=True)
+
+    def select(self, query: str, max_chars: int) -> str:
+        """Best-matching chunks that fit in max_chars, in document order. Empty if nothing matches."""
+        picked, used = [], 0
+        for _, cid in self.search(query):
+            size = len(self.chunks[cid]) + 5
+            if used + size > max_chars:
+                continue
+            picked.append(cid)
+            used += size
+        return "\n[…]\n".join(self.chunks[cid] for cid in sorted(picked))
+
+
+@functools.lru_cache(maxsize=16)
+def get_document_index(text: str) -> DocumentIndex:
+    """Index is built once per uploaded text and reused across reruns."""
+    return DocumentIndex(text)
+
+
+def retrieve_context(text: str, query: str, max_chars: int = 3000) -> str:
+    """
+    Pick the passages of the uploaded material most relevant to query, within max_chars.
+    Short documents are returned whole; with no matching terms, falls back to the start.
+    """
+    if len(text) <= max_chars:
+        return text
+    selected = get_document_index(text).select(query, max_chars)
+    if not selected:
+        return truncate_context(text, max_chars)
+    return selected + "\n\n[...most relevant excerpts shown...]"
+
+
 def build_context_block(uploaded_text: str, topic: str = "") -> str:
     """Build a context block string for prompts."""
     if not uploaded_text:
@@ -56,5 +352,5 @@ def build_context_block(uploaded_text: str, topic: str = "") -> str:
     if uploaded_text.startswith("[PDF uploaded:") or uploaded_text.startswith("[PDF:"):
         return f"Student uploaded: {uploaded_text}\nTopic asked: {topic}"
 
-    truncated = truncate_context(uploaded_text)
-    return f"Student's uploaded study material:\n{truncated}\n\nTopic/Question: {topic}"
+    excerpts = retrieve_context(uploaded_text, topic)
+    return f"Student's uploaded study material:\n{excerpts}\n\nTopic/Question: {topic}"
@@ -0,0 +1,85 @@
+"""Speculative background generation of the next deck / test — BharatiyaAI × LearnOS"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from utils.ai import _setting
+
+
+@st.cache_resource(show_spinner=False)
+def _executor() -> ThreadPoolExecutor:
+    """One small pool for every session; prefetches still queue fairly through admission control."""
+    return ThreadPoolExecutor(max_workers=int(_setting("AI_PREFETCH_WORKERS", 4)),
+                              thread_name_prefix="prefetch")
+
+
+def next_study_topic(current: str = "") -> str:
+    """
+    What to study next after `current` (a topic or a ", "-joined topic list): the top
+    revision-queue topic not already in it, else the next week's topics.
+    """
+    studying = set(current.split(", ")) | {current}
+    for topic in st.session_state.revision_queue:
+        if topic not in studying:
+            return topic
+    weeks = (st.session_state.get("curriculum") or {}).get("weeks", [])
+    idx = st.session_state.get("active_week", 0)
+    for week in weeks[idx + 1:] + weeks[idx:idx + 1]:
+        topics = ", ".join(week.get("topics", []))
+        if topics and topics != current:
+            return topics
+    return ""
+
+
+def prefetch(slot: str, topic: str, fn, *args):
+    """
+    Start fn(*args) on a worker unless `slot` already holds a job for `topic`.
+    The Future is parked in session state under prefetch_<slot>. Runs on every
+    rerun, so anything costly (building prompt context) belongs inside fn.
+    """
+    key = f"prefetch_{slot}"
+    parked = st.session_state.get(key)
+    if not topic or (parked and parked["topic"] == topic):
+        return
+    ctx = get_script_run_ctx()
+
+    def _run():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+
+    st.session_state[key] = {"topic": topic, "future": _executor().submit(_run)}
+
+
+def peek(slot: str) -> str:
+    """Topic of the job parked in `slot` that hasn't failed, or ""."""
+    parked = st.session_state.get(f"prefetch_{slot}")
+    if not parked:
+        return ""
+    future: Future = parked["future"]
+    if future.done() and (future.exception() is not None or not future.result()):
+        return ""
+    return parked["topic"]
+
+
+def take(slot: str, timeout: float = 90.0):
+    """
+    Claim the parked result as (topic, result), waiting for it if still running.
+    Returns ("", None) if nothing usable is parked. The slot is cleared either way.
+    """
+    parked = st.session_state.pop(f"prefetch_{slot}", None)
+    if not parked:
+        return "", None
+    try:
+        result = parked["future"].result(timeout=timeout)
+    except Exception:
+        return "", None
+    return (parked["topic"], result) if result else ("", None)
+
+
+def discard(slot: str):
+    """Forget a parked job (its reply still lands in the response cache)."""
+    st.session_state.pop(f"prefetch_{slot}", None)
@@ -0,0 +1,59 @@
+"""Incremental curriculum priority index — BharatiyaAI × LearnOS"""
+
+from bisect import bisect_left
+
+
+def week_urgency(topics: list, confidence: dict, weak) -> float:
+    """Lower average confidence + more weak-topic overlaps = higher urgency."""
+    scores = [confidence[t]["score"] for t in topics if t in confidence]
+    avg = sum(scores) / len(scores) if scores else 50
+    weak_overlap = sum(1 for t in topics if t in weak)
+    return (100 - avg) + (weak_overlap * 15)
+
+
+class PriorityIndex:
+    """
+    Curriculum weeks ordered by urgency (most urgent first, ties by week number),
+    kept current one topic at a time. An inverted topic → weeks index finds the
+    k weeks a confidence change touches; each is re-scored and moved inside a
+    sorted list of (-urgency, week) keys by bisection — O(k log W) comparisons
+    instead of rescanning every topic and re-sorting every week.
+    """
+
+    def __init__(self, curriculum: dict, confidence: dict, weak):
+        self.curriculum = curriculum
+        self._topics = [week.get("topics", []) for week in curriculum.get("weeks", [])]
+        self._weeks_of = {}
+        for i, topics in enumerate(self._topics):
+            for topic in topics:
+                weeks = self._weeks_of.setdefault(topic, [])
+                if not weeks or weeks[-1] != i:
+                    weeks.append(i)
+        self._keys = [(-week_urgency(topics, confidence, weak), i) for i, topics in enumerate(self._topics)]
+        self._order = sorted(self._keys)
+        self._dirty = set()
+
+    def touch(self, topic: str):
+        """Mark the weeks containing `topic` for re-scoring on the next update()."""
+        self._dirty.update(self._weeks_of.get(topic, ()))
+
+    def update(self, confidence: dict, weak) -> bool:
+        """Re-score touched weeks; returns whether the week order changed."""
+        moved = False
+        for i in self._dirty:
+            old = self._keys[i]
+            new = (-week_urgency(self._topics[i], confidence, weak), i)
+            if new == old:
+                continue
+            pos = bisect_left(self._order, old)
+            del self._order[pos]
+            at = bisect_left(self._order, new)
+            self._order.insert(at, new)
+            self._keys[i] = new
+            moved = moved or at != pos
+        self._dirty.clear()
+        return moved
+
+    def priority(self) -> list:
+        """Week indices, most urgent first."""
+        return [i for _, i in self._order]
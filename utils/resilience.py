@@ -0,0 +1,260 @@
+"""Retry, backoff and circuit breaking for upstream AI calls — BharatiyaAI × LearnOS"""
+
+import asyncio
+import random
+import threading
+import time
+from contextlib import nullcontext
+
+import anthropic
+
+
+# ── TYPED ERRORS ──
+# str(err) is the "ERROR:..." code call_claude returns; .message is safe to show students.
+
+class AIError(Exception):
+    """Base class for AI call failures."""
+    message = "BharatiyaAI couldn't complete that request. Please try again."
+
+
+class AIAuthError(AIError):
+    message = "Invalid API key. Add ANTHROPIC_API_KEY to .streamlit/secrets.toml"
+
+
+class AIRateLimitError(AIError):
+    message = "Lots of students are studying right now — please try again in a few seconds."
+
+
+class AIUnavailableError(AIError):
+    message = "BharatiyaAI is temporarily overloaded. Please try again shortly."
+
+
+class AICircuitOpenError(AIUnavailableError):
+    message = "BharatiyaAI is recovering from heavy load — please try again in a few seconds."
+
+
+class AIEmptyReplyError(AIError):
+    message = "BharatiyaAI didn't return an answer that time. Please try again."
+
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Transient upstream trouble: rate limits, overload, 5xx, dropped connections, timeouts."""
+    if isinstance(exc, anthropic.APIConnectionError):    # includes APITimeoutError
+        return True
+    if isinstance(exc, anthropic.APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS or exc.status_code >= 500
+    return False
+
+
+def classify(exc: Exception) -> AIError:
+    """Map an SDK exception onto the typed error hierarchy."""
+    if isinstance(exc, AIError):
+        return exc
+    if isinstance(exc, anthropic.AuthenticationError):
+        return AIAuthError("ERROR:AUTH")
+    if isinstance(exc, anthropic.RateLimitError):
+        return AIRateLimitError("ERROR:RATE_LIMIT")
+    if is_retryable(exc):
+        return AIUnavailableError("ERROR:OVERLOADED")
+    return AIError(f"ERROR:{str(exc)}")
+
+
+def backoff_delay(attempt: int, exc: Exception | None = None,
+                  base: float = 0.5, cap: float = 8.0) -> float:
+    """
+    Full-jitter exponential backoff, so retrying students spread out instead of
+    hitting the API in lock-step. Honours a Retry-After header when one is sent.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    response = getattr(exc, "response", None)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("retry-after", ""))
+            delay = max(delay, min(cap, retry_after))
+        except (TypeError, ValueError):
+            pass
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Per-process breaker. After `threshold` consecutive upstream failures it opens and
+    fails every call fast for `cooldown` seconds, then lets a single probe through;
+    the probe's outcome closes it again or restarts the cooldown.
+    """
+
+    def __init__(self, threshold: int = 5, cooldown: float = 20.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        """
+        Truthy if a call may go upstream: "probe" for the single half-open probe,
+        True when closed. A probe that ends without an upstream verdict must call
+        release_probe(), or the breaker would stay half-open and reject everyone.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return "probe"
+            self._stats["rejected"] += 1
+            return False
+
+    def release_probe(self):
+        """The probe was abandoned (stream closed early, rerun, cancellation): let the next caller probe."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                if self._opened_at is None or self._probing:
+                    self._stats["opened"] += 1
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self._state(), "consecutive_failures": self._failures, **self._stats}
+
+
+def _answered(exc: Exception) -> bool:
+    """The upstream returned an HTTP response — as opposed to a local failure that never reached it."""
+    return isinstance(exc, anthropic.APIStatusError)
+
+
+def call_with_retries(fn, breaker: CircuitBreaker, attempts: int = 4,
+                      base_delay: float = 0.5, max_delay: float = 8.0, admit=nullcontext):
+    """
+    Run fn() with jittered retries on transient errors. Raises a typed AIError.
+    Each attempt runs inside its own admit() slot, so a retry is admitted (and charged)
+    like any other request and no slot is held through a backoff sleep. A failure to
+    be admitted is local: it is raised as is and never reaches the breaker.
+    """
+    for attempt in range(attempts):
+        with admit():
+            ticket = breaker.allow()
+            if not ticket:
+                raise AICircuitOpenError("ERROR:BUSY")
+            settled = False
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    if _answered(e):
+                        settled = True
+                        breaker.record_success()    # upstream answered; the request itself was bad
+                    raise classify(e) from e
+                settled = True
+                breaker.record_failure()
+                if attempt == attempts - 1:
+                    raise classify(e) from e
+                delay = backoff_delay(attempt, e, base_delay, max_delay)
+            else:
+                settled = True
+                breaker.record_success()
+                return result
+            finally:
+                if ticket == "probe" and not settled:
+                    breaker.release_probe()
+        time.sleep(delay)
+
+
+def stream_with_retries(open_stream, breaker: CircuitBreaker, attempts: int = 4,
+                        base_delay: float = 0.5, max_delay: float = 8.0, admit=nullcontext):
+    """
+    Yield from open_stream() with the same retry and admission policy as call_with_retries.
+    Only failures before the first delta are retried — text already shown can't be unsent.
+    """
+    for attempt in range(attempts):
+        with admit():
+            ticket = breaker.allow()
+            if not ticket:
+                raise AICircuitOpenError("ERROR:BUSY")
+            emitted = settled = False
+            try:
+                for delta in open_stream():
+                    emitted = True
+                    yield delta
+            except Exception as e:
+                if not is_retryable(e):
+                    if _answered(e):
+                        settled = True
+                        breaker.record_success()
+                    raise classify(e) from e
+                settled = True
+                breaker.record_failure()
+                if emitted or attempt == attempts - 1:
+                    raise classify(e) from e
+                delay = backoff_delay(attempt, e, base_delay, max_delay)
+            else:
+                settled = True
+                breaker.record_success()
+                return
+            finally:
+                # Also reached when the consumer closes the generator mid-stream
+                if ticket == "probe" and not settled:
+                    breaker.release_probe()
+        time.sleep(delay)
+
+
+async def acall_with_retries(fn, breaker: CircuitBreaker, attempts: int = 4,
+                             base_delay: float = 0.5, max_delay: float = 8.0, admit=nullcontext):
+    """Async twin of call_with_retries: awaits fn() inside async admit() slots and backs off without blocking the loop."""
+    for attempt in range(attempts):
+        async with admit():
+            ticket = breaker.allow()
+            if not ticket:
+                raise AICircuitOpenError("ERROR:BUSY")
+            settled = False
+            try:
+                result = await fn()
+            except Exception as e:
+                if not is_retryable(e):
+                    if _answered(e):
+                        settled = True
+                        breaker.record_success()
+                    raise classify(e) from e
+                settled = True
+                breaker.record_failure()
+                if attempt == attempts - 1:
+                    raise classify(e) from e
+                delay = backoff_delay(attempt, e, base_delay, max_delay)
+            else:
+                settled = True
+                breaker.record_success()
+                return result
+            finally:
+                if ticket == "probe" and not settled:
+                    breaker.release_probe()
+        await asyncio.sleep(delay)
@@ -1,10 +1,29 @@
 """Session state initialiser for BharatiyaAI × LearnOS"""
 
+import time
+import uuid
+from collections import deque
+from itertools import chain
+
 import streamlit as st
 
+from utils.concepts import ConceptSet
+from utils.confidence import ConfidenceTable
+from utils.priority import PriorityIndex
+from utils.store import learner_store, event_journal, encode, decode
 
-def init_session():
-    defaults = {
+# Never persisted: wizard position and one-shot UI state
+TRANSIENT_KEYS = {"onboard_step", "fc_flipped"}
+# Dicts keyed by question index — JSON turns the keys into strings
+INT_KEYED = {"practice_answers", "practice_feedbacks", "practice_revealed"}
+# Ordered concept sets — stored as JSON lists
+CONCEPT_KEYS = ("weak_concepts", "strong_concepts", "revision_queue")
+# Recent interactions kept in session for the UI; the full history goes to the journal
+INTERACTION_LOG_SIZE = 50
+
+
+def _defaults() -> dict:
+    return {
         # Onboarding
         "onboarded": False,
         "onboard_step": 0,
@@ -39,6 +58,7 @@ def init_session():
         "fc_known": [],
         "fc_flipped": False,
         "fc_cards": [],
+        "fc_logged": False,     # the current deck's completion has been recorded
 
         # Mind map
         "mindmap_data": None,
@@ -49,18 +69,20 @@ def init_session():
         "practice_feedbacks": {},
         "practice_revealed": {},
         "practice_generated": False,
+        "practice_topic": "",   # topics the current set was generated for
 
         # Insights
         "insights_data": None,
+        "adaptation_data": None,
 
         # ── ADAPTIVE INTELLIGENCE ENGINE ──
-        # topic_confidence: {topic_name: {"score": 0-100, "attempts": int, "correct": int,
-        #                                  "fc_known": int, "fc_total": int, "status": "weak|learning|strong"}}
-        "topic_confidence": {},
+        # topic_confidence: ConfidenceTable — topic_name -> row read like {"score": 0-100, "attempts": int,
+        #   "correct": int, "fc_known": int, "fc_total": int, "status": "weak|learning|strong"}
+        "topic_confidence": ConfidenceTable(),
 
-        # interaction_log: list of {"type": "practice|flashcard|doubt", "topic": str,
-        #                            "correct": bool|None, "timestamp": str}
-        "interaction_log": [],
+        # interaction_log: ring of the last INTERACTION_LOG_SIZE
+        #   {"type": "practice|flashcard|doubt|explain", "topic": str, "correct": bool|None, "ts": epoch}
+        "interaction_log": deque(maxlen=INTERACTION_LOG_SIZE),
 
         # curriculum_priority: list of week indices sorted by urgency (weakest first)
         "curriculum_priority": [],
@@ -71,20 +93,150 @@ def init_session():
         # adaptation_triggered: bool — did the system reorder this session?
         "adaptation_triggered": False,
 
-        # revision_queue: list of topics flagged for targeted revision
-        "revision_queue": [],
+        # revision_queue: topics flagged for targeted revision, oldest first
+        "revision_queue": ConceptSet(),
 
-        # Session tracking
-        "weak_concepts": [],
-        "strong_concepts": [],
+        # Session tracking — a concept is weak or strong, never both
+        "weak_concepts": ConceptSet(),
+        "strong_concepts": ConceptSet(),
         "questions_attempted": 0,
         "correct_count": 0,
         "session_score": None,
     }
 
-    for key, val in defaults.items():
+
+def init_session():
+    if not st.session_state.get("_hydrated"):
+        _hydrate()
+
+    for key, val in _defaults().items():
         if key not in st.session_state:
             st.session_state[key] = val
+    _coerce_state()
+
+
+# ── PERSISTENCE ──
+# Learner state is keyed by a student id carried in the URL (?student=…), so a
+# returning visit — or a reload — picks up where the student left off.
+
+def _hydrate():
+    """Load the student's stored state once per browser session."""
+    st.session_state._hydrated = True
+    store = learner_store()
+    student_id = st.query_params.get("student")
+    if not student_id:
+        student_id = uuid.uuid4().hex[:12]
+        st.query_params["student"] = student_id
+    st.session_state.student_id = student_id
+    if store is None:
+        return
+
+    persisted = _persisted_keys()
+    seen = st.session_state.setdefault("_persisted", {})
+    for key, text in store.load(student_id).items():
+        if key not in persisted:
+            continue
+        try:
+            value = decode(text)
+        except ValueError:
+            continue
+        if key in INT_KEYED and isinstance(value, dict):
+            value = {int(k): v for k, v in value.items()}
+        st.session_state[key] = value
+        seen[key] = (_snapshot(value), hash(text))
+
+
+def _coerce_state():
+    """Plain JSON loaded from the store (or seeded by tests) becomes the compact session types."""
+    if not isinstance(st.session_state.topic_confidence, ConfidenceTable):
+        st.session_state.topic_confidence = ConfidenceTable.from_json(st.session_state.topic_confidence)
+
+    log = st.session_state.interaction_log
+    if not isinstance(log, deque) or log.maxlen != INTERACTION_LOG_SIZE:
+        st.session_state.interaction_log = deque(log, maxlen=INTERACTION_LOG_SIZE)
+
+    coerced = False
+    for key in CONCEPT_KEYS:
+        value = st.session_state[key]
+        if not isinstance(value, ConceptSet):
+            st.session_state[key] = ConceptSet(value or ())
+            coerced = True
+    if coerced:
+        # Older records could hold a concept in both; the strong flag was always the later one
+        weak = st.session_state.weak_concepts
+        for concept in st.session_state.strong_concepts:
+            weak.discard(concept)
+
+
+def _persisted_keys() -> set:
+    return set(_defaults()) - TRANSIENT_KEYS
+
+
+def _snapshot(value) -> tuple:
+    """
+    What save_session compares to tell whether a value may have changed, without
+    encoding it: the object plus its version counter (ConceptSet, ConfidenceTable)
+    or its top-level items. Pages replace values or assign into them at the top
+    level; nothing edits a nested value in place.
+    """
+    version = getattr(value, "version", None)
+    if version is not None:
+        return value, version
+    if isinstance(value, dict):
+        return value, tuple(chain.from_iterable(value.items()))
+    if isinstance(value, (list, deque)):
+        return value, tuple(value)
+    return value, None
+
+
+def _unchanged(snapshot: tuple, value) -> bool:
+    old, parts = snapshot
+    if old is not value:
+        return False
+    now = _snapshot(value)[1]
+    if isinstance(parts, tuple):
+        return len(parts) == len(now) and all(a is b for a, b in zip(parts, now))
+    return parts == now
+
+
+def save_session():
+    """
+    Queue changed learner state for the write-behind store. Called once per run;
+    a value is only encoded when its snapshot moved, and only written when the
+    encoding differs from the last one queued.
+    """
+    store = learner_store()
+    student_id = st.session_state.get("student_id")
+    if store is None or not student_id:
+        return
+    seen = st.session_state.setdefault("_persisted", {})
+    changes = {}
+    for key in _persisted_keys():
+        if key not in st.session_state:
+            continue
+        value = st.session_state[key]
+        last = seen.get(key)
+        if last is not None and _unchanged(last[0], value):
+            continue
+        try:
+            text = encode(value)
+        except (TypeError, ValueError):
+            continue
+        digest = hash(text)
+        seen[key] = (_snapshot(value), digest)
+        if last is not None and last[1] == digest:
+            continue
+        changes[key] = text
+    if changes:
+        store.enqueue(student_id, changes)
+
+
+def start_new_session():
+    """Start over as a new student. The old record stays stored under its own link."""
+    save_session()
+    for key in list(st.session_state.keys()):
+        del st.session_state[key]
+    st.query_params.pop("student", None)
 
 
 def set_tab(tab_name: str):
@@ -100,21 +252,19 @@ def add_topic_studied(topic: str):
 def flag_weak(concept: str):
     if not concept:
         return
-    if concept not in st.session_state.weak_concepts:
-        st.session_state.weak_concepts.append(concept)
-    if concept in st.session_state.strong_concepts:
-        st.session_state.strong_concepts.remove(concept)
-    _update_topic_confidence(concept, correct=False)
+    st.session_state.strong_concepts.discard(concept)
+    st.session_state.weak_concepts.add(concept)
     _add_to_revision_queue(concept)
+    _update_topic_confidence(concept, correct=False)
 
 
 def flag_strong(concept: str):
     if not concept:
         return
-    if concept not in st.session_state.strong_concepts:
-        st.session_state.strong_concepts.append(concept)
-    _update_topic_confidence(concept, correct=True)
+    st.session_state.weak_concepts.discard(concept)
+    st.session_state.strong_concepts.add(concept)
     _remove_from_revision_queue(concept)
+    _update_topic_confidence(concept, correct=True)
 
 
 # ── ADAPTIVE ENGINE INTERNALS ──
@@ -123,22 +273,16 @@ def _ensure_topic_confidence(topic: str):
     """Initialise topic confidence entry if missing."""
     tc = st.session_state.topic_confidence
     if topic and topic not in tc:
-        tc[topic] = {
-            "score": 50,          # start neutral
-            "attempts": 0,
-            "correct": 0,
-            "fc_known": 0,
-            "fc_total": 0,
-            "status": "learning",
-        }
-    st.session_state.topic_confidence = tc
+        index = st.session_state.get("_priority_index")
+        if index is not None:
+            index.touch(topic)      # a newly scored topic shifts its weeks' averages
+        tc.ensure(topic)          # start neutral: score 50, "learning"
 
 
 def _update_topic_confidence(topic: str, correct: bool):
     """Update topic confidence score based on performance signal."""
     _ensure_topic_confidence(topic)
-    tc = st.session_state.topic_confidence
-    entry = tc[topic]
+    entry = st.session_state.topic_confidence[topic]
     entry["attempts"] += 1
     if correct:
         entry["correct"] += 1
@@ -158,16 +302,13 @@ def _update_topic_confidence(topic: str, correct: bool):
     else:
         entry["status"] = "weak"
 
-    tc[topic] = entry
-    st.session_state.topic_confidence = tc
-    _reorder_curriculum_priority()
+    _reorder_curriculum_priority(topic)
 
 
 def update_fc_confidence(topic: str, known: int, total: int):
     """Update confidence from flashcard session results."""
     _ensure_topic_confidence(topic)
-    tc = st.session_state.topic_confidence
-    entry = tc[topic]
+    entry = st.session_state.topic_confidence[topic]
     entry["fc_known"] = known
     entry["fc_total"] = total
     if total > 0:
@@ -175,64 +316,53 @@ def update_fc_confidence(topic: str, known: int, total: int):
         # Blend flashcard signal (30%) with existing score (70%)
         entry["score"] = round(0.7 * entry["score"] + 0.3 * fc_ratio * 100)
     entry["status"] = "strong" if entry["score"] >= 75 else ("learning" if entry["score"] >= 40 else "weak")
-    tc[topic] = entry
-    st.session_state.topic_confidence = tc
-    _reorder_curriculum_priority()
+    _reorder_curriculum_priority(topic)
 
 
 def log_interaction(interaction_type: str, topic: str, correct=None):
-    """Append to interaction log."""
-    from datetime import datetime
-    log = st.session_state.interaction_log
-    log.append({
+    """Record an interaction in the session ring and the durable journal."""
+    event = {
         "type": interaction_type,
         "topic": topic,
         "correct": correct,
-        "timestamp": datetime.now().strftime("%H:%M"),
-    })
-    st.session_state.interaction_log = log[-50:]  # keep last 50
+        "ts": round(time.time(), 3),
+    }
+    st.session_state.interaction_log.append(event)     # the ring drops the oldest past 50
+    journal = event_journal()
+    if journal is not None:
+        journal.append(st.session_state.get("student_id", ""), event)
 
 
 def _add_to_revision_queue(topic: str):
-    rq = st.session_state.revision_queue
-    if topic and topic not in rq:
-        rq.append(topic)
-    st.session_state.revision_queue = rq
+    st.session_state.revision_queue.add(topic)
 
 
 def _remove_from_revision_queue(topic: str):
-    rq = st.session_state.revision_queue
-    if topic in rq:
-        rq.remove(topic)
-    st.session_state.revision_queue = rq
+    st.session_state.revision_queue.discard(topic)
 
 
-def _reorder_curriculum_priority():
+def _reorder_curriculum_priority(topic: str):
     """
-    Reorder curriculum weeks by urgency.
-    Weeks whose topics overlap with weak concepts get higher priority.
+    Reorder curriculum weeks by urgency after a confidence change on `topic`.
+    Weeks whose topics overlap with weak concepts get higher priority; only the
+    weeks containing `topic` (and any newly tracked topics) are re-scored.
     """
     curriculum = st.session_state.get("curriculum")
     if not curriculum:
         return
-    weeks = curriculum.get("weeks", [])
     tc = st.session_state.topic_confidence
-    weak_set = set(st.session_state.weak_concepts)
-
-    scored_weeks = []
-    for i, week in enumerate(weeks):
-        topics = week.get("topics", [])
-        # Average confidence for topics in this week
-        scores = [tc[t]["score"] for t in topics if t in tc]
-        avg = sum(scores) / len(scores) if scores else 50
-        # Count weak topic overlaps
-        weak_overlap = len([t for t in topics if t in weak_set])
-        # Priority score: lower confidence + more weak overlaps = higher urgency
-        urgency = (100 - avg) + (weak_overlap * 15)
-        scored_weeks.append((i, urgency))
-
-    scored_weeks.sort(key=lambda x: x[1], reverse=True)
-    priority = [idx for idx, _ in scored_weeks]
+    weak_set = st.session_state.weak_concepts
+
+    index = st.session_state.get("_priority_index")
+    if index is None or index.curriculum is not curriculum:
+        # Built once per curriculum (and per browser session); not persisted
+        index = PriorityIndex(curriculum, tc, weak_set)
+        st.session_state._priority_index = index
+    else:
+        index.touch(topic)
+        if not index.update(tc, weak_set) and st.session_state.curriculum_priority:
+            return
+    priority = index.priority()
 
     if priority != st.session_state.curriculum_priority:
         st.session_state.curriculum_priority = priority
@@ -242,7 +372,7 @@ def _reorder_curriculum_priority():
 
 def get_weak_context_string() -> str:
     """Return a formatted string of weak topics for prompt injection."""
-    weak = st.session_state.get("weak_concepts", [])
+    weak = st.session_state.get("weak_concepts", ConceptSet())
     tc = st.session_state.get("topic_confidence", {})
     if not weak:
         return ""
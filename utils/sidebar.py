@@ -1,7 +1,7 @@
 """BharatiyaAI × LearnOS — Sidebar Navigation"""
 
 import streamlit as st
-from utils.session import set_tab
+from utils.session import set_tab, start_new_session
 import math
 
 def make_chakra(size=32, color="#FF6B2B"):
@@ -172,7 +172,7 @@ section[data-testid="stSidebar"] .stButton > button[kind="secondary"] {
                     st.markdown('</div>', unsafe_allow_html=True)
 
         # ── WEAK CONCEPTS ──
-        weak = st.session_state.get("weak_concepts", [])
+        weak = st.session_state.weak_concepts
         st.markdown(
             '<div style="padding:0.875rem 1rem 0.5rem;border-top:1px solid rgba(255,255,255,0.06);'
             'margin-top:0.5rem;">'
@@ -196,7 +196,7 @@ section[data-testid="stSidebar"] .stButton > button[kind="secondary"] {
         st.markdown('</div>', unsafe_allow_html=True)
 
         # ── REVISION QUEUE COUNT ──
-        rq = st.session_state.get("revision_queue", [])
+        rq = st.session_state.revision_queue
         if rq:
             st.markdown(
                 f'<div style="padding:0 1rem 0.75rem;">'
@@ -211,8 +211,7 @@ section[data-testid="stSidebar"] .stButton > button[kind="secondary"] {
         st.markdown('<div style="padding:0 0.75rem 1rem;margin-top:0.25rem;">',
                     unsafe_allow_html=True)
         if st.button("↩ New Session", use_container_width=True, key="reset_session"):
-            for key in list(st.session_state.keys()):
-                del st.session_state[key]
+            start_new_session()
             st.rerun()
         st.markdown('</div>', unsafe_allow_html=True)
 
@@ -0,0 +1,290 @@
+"""Persistent learner state for BharatiyaAI × LearnOS"""
+
+import atexit
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import streamlit as st
+
+DEFAULT_DB_PATH = os.path.join(".data", "learners.sqlite3")
+DEFAULT_JOURNAL_PATH = os.path.join(".data", "interactions.jsonl")
+
+
+class LearnerStore:
+    """
+    Backend interface: one row per (student, session key) holding a JSON string.
+    Subclass and point LEARNER_STORE at "package.module:Class" to plug in another database.
+    """
+
+    def load(self, student_id: str) -> dict:
+        """Return {key: json_text} for a student ({} if unknown)."""
+        raise NotImplementedError
+
+    def save_many(self, rows: list):
+        """Upsert [(student_id, key, json_text)] as one batch."""
+        raise NotImplementedError
+
+    def delete(self, student_id: str):
+        raise NotImplementedError
+
+
+class MemoryLearnerStore(LearnerStore):
+    """Process-local store — survives reruns and tab reloads, not server restarts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+
+    def load(self, student_id: str) -> dict:
+        with self._lock:
+            return dict(self._rows.get(student_id, {}))
+
+    def save_many(self, rows: list):
+        with self._lock:
+            for student_id, key, value in rows:
+                self._rows.setdefault(student_id, {})[key] = value
+
+    def delete(self, student_id: str):
+        with self._lock:
+            self._rows.pop(student_id, None)
+
+
+class SQLiteLearnerStore(LearnerStore):
+    """SQLite in WAL mode, so the write-behind thread never blocks readers rehydrating a session."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS learner_state ("
+            "student_id TEXT, key TEXT, value TEXT, updated_at REAL, "
+            "PRIMARY KEY (student_id, key))"
+        )
+        self._db.commit()
+
+    def load(self, student_id: str) -> dict:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, value FROM learner_state WHERE student_id = ?", (student_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def save_many(self, rows: list):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO learner_state (student_id, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                [(student_id, key, value, now) for student_id, key, value in rows],
+            )
+            self._db.commit()
+
+    def delete(self, student_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM learner_state WHERE student_id = ?", (student_id,))
+            self._db.commit()
+
+
+class WriteBehind:
+    """
+    Coalescing write-behind buffer in front of a LearnerStore. enqueue() only
+    touches a dict — rendering never waits on disk. A daemon thread flushes
+    everything pending as one batch every `interval` seconds; later writes to
+    the same (student, key) replace earlier ones that haven't been flushed yet.
+    """
+
+    def __init__(self, store: LearnerStore, interval: float = 0.5):
+        self.store = store
+        self.interval = interval
+        self._pending = {}          # (student_id, key) -> json_text
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stats = {"enqueued": 0, "written": 0, "batches": 0, "errors": 0}
+        atexit.register(self.flush)
+
+    def load(self, student_id: str) -> dict:
+        """Stored state overlaid with writes still waiting to be flushed."""
+        rows = self.store.load(student_id)
+        with self._cond:
+            rows.update({key: value for (sid, key), value in self._pending.items() if sid == student_id})
+        return rows
+
+    def enqueue(self, student_id: str, changes: dict):
+        with self._cond:
+            for key, value in changes.items():
+                self._pending[(student_id, key)] = value
+            self._stats["enqueued"] += len(changes)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="learner-store", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def flush(self):
+        """Write everything pending now (also runs at interpreter exit)."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return
+            try:
+                self.store.save_many([(sid, key, value) for (sid, key), value in batch.items()])
+            except Exception:
+                with self._cond:
+                    self._stats["errors"] += 1
+                    for item, value in batch.items():
+                        self._pending.setdefault(item, value)   # retry next round; newer writes win
+                return
+            with self._cond:
+                self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.interval)     # let a burst of reruns coalesce into one batch
+            self.flush()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._stats, "pending": len(self._pending)}
+
+
+class EventJournal:
+    """
+    Append-only JSON Lines journal of learner interactions, one compact record per
+    line with a real epoch timestamp. Nothing is ever rewritten or trimmed, so
+    analytics can replay full histories long after the in-session ring has moved on.
+    append() only queues the event; like WriteBehind, a daemon thread encodes and
+    writes everything pending in one write + flush every `interval` seconds.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH, interval: float = 0.5):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.interval = interval
+        self._pending = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stats = {"appended": 0, "written": 0, "batches": 0, "errors": 0}
+        self._file = open(path, "a", encoding="utf-8")
+        atexit.register(self.close)
+
+    def append(self, student_id: str, event: dict):
+        with self._cond:
+            self._pending.append({"student": student_id, **event})
+            self._stats["appended"] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-journal", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def flush(self):
+        """Write everything pending now (also runs at close and interpreter exit)."""
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch or self._file.closed:
+                return
+            try:
+                self._file.write("".join(encode(event) + "\n" for event in batch))
+                self._file.flush()      # a crash loses at most one interval of events
+            except (OSError, TypeError, ValueError):
+                with self._cond:
+                    self._stats["errors"] += 1
+                return
+            with self._cond:
+                self._stats["written"] += len(batch)
+                self._stats["batches"] += 1
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            time.sleep(self.interval)     # let a burst of interactions share one write
+            self.flush()
+
+    def close(self):
+        self.flush()
+        with self._flush_lock:
+            self._file.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._stats, "pending": len(self._pending)}
+
+    def replay(self, student_id: str | None = None):
+        """Yield journalled events in order, optionally for one student; skips torn lines."""
+        self.flush()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = decode(line)
+                except ValueError:
+                    continue
+                if student_id is None or event.get("student") == student_id:
+                    yield event
+
+
+def _backend() -> LearnerStore | None:
+    kind = os.environ.get("LEARNER_STORE", "sqlite").strip()
+    if kind in ("", "none", "off"):
+        return None
+    if kind == "memory":
+        return MemoryLearnerStore()
+    if kind == "sqlite":
+        try:
+            return SQLiteLearnerStore(os.environ.get("LEARNER_DB_PATH", DEFAULT_DB_PATH))
+        except (OSError, sqlite3.Error):
+            return MemoryLearnerStore()     # read-only box: keep state for the process at least
+    module, _, cls = kind.partition(":")
+    return getattr(importlib.import_module(module), cls)()
+
+
+@st.cache_resource(show_spinner=False)
+def learner_store() -> WriteBehind | None:
+    """The process-wide learner store (LEARNER_STORE=sqlite|memory|none|module:Class)."""
+    backend = _backend()
+    if backend is None:
+        return None
+    return WriteBehind(backend, interval=float(os.environ.get("LEARNER_FLUSH_INTERVAL", 0.5)))
+
+
+@st.cache_resource(show_spinner=False)
+def event_journal() -> EventJournal | None:
+    """The process-wide interaction journal (LEARNER_JOURNAL_PATH, or "none" to disable)."""
+    path = os.environ.get("LEARNER_JOURNAL_PATH", DEFAULT_JOURNAL_PATH).strip()
+    if path in ("", "none", "off"):
+        return None
+    try:
+        return EventJournal(path, interval=float(os.environ.get("LEARNER_FLUSH_INTERVAL", 0.5)))
+    except OSError:
+        return None
+
+
+def _to_json(value):
+    """json.dumps fallback for state objects that know their JSON form (e.g. ConceptSet)."""
+    if hasattr(value, "to_json"):
+        return value.to_json()
+    if isinstance(value, deque):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_to_json)
+
+
+def decode(text: str):
+    return json.loads(text)